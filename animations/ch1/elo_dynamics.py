@@ -7,9 +7,15 @@ Run with:
     manim -qh --disable_caching --media_dir media/ch1 animations/ch1/elo_dynamics.py EloDynamics
 """
 
+import os
+import sys
+
 from manim import *
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sections import play_sections
+
 # ── design tokens ───────────────────────────────────────────────────
 ACCENT = "#FFD966"
 BG = "#0f0f0f"
@@ -29,10 +35,7 @@ class EloDynamics(Scene):
         self.camera.background_color = BG
         np.random.seed(7)
 
-        self.play_title()
-        self.play_bt_formula()
-        self.play_elo_arena()
-        self.play_takeaway()
+        play_sections(self, "play_title", "play_bt_formula", "play_elo_arena", "play_takeaway")
 
     # ── title ───────────────────────────────────────────────────────
     def play_title(self):
@@ -7,9 +7,15 @@ Run with:
     manim -qh --disable_caching --media_dir media/ch1 animations/ch1/factor_model.py FactorModel
 """
 
+import os
+import sys
+
 from manim import *
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sections import play_sections
+
 # ── design tokens ───────────────────────────────────────────────────
 ACCENT = "#FFD966"
 BG = "#0f0f0f"
@@ -22,12 +28,8 @@ class FactorModel(Scene):
     def construct(self):
         self.camera.background_color = BG
         np.random.seed(42)
-        self.play_title()
-        self.play_one_factor()
-        self.play_two_factors()
-        self.play_loading_space()
-        self.play_heterogeneity()
-        self.play_takeaway()
+        play_sections(self, "play_title", "play_one_factor", "play_two_factors",
+                      "play_loading_space", "play_heterogeneity", "play_takeaway")
 
     # ── title ───────────────────────────────────────────────────────
     def play_title(self):
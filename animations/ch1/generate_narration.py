@@ -2,13 +2,25 @@
 Generate TTS narration from script.md using edge-tts.
 
 Produces per-section audio files aligned to animation clip durations.
-Text is split into chunks at pause markers, with real silence inserted
-between them via ffmpeg.
+Text is split into chunks at pause markers. The text chunks of all
+sections are synthesized concurrently and cached by (text, voice, rate) in
+animations/.tts_cache (see animations/narration.py), so only edited chunks
+are re-synthesized. Each section is assembled in memory from decoded TTS
+PCM and zero-filled pauses and encoded once.
+
+Rates are chosen per chunk from a duration model fitted on the cache, and
+pauses are stretched or shortened with the real chunk durations, so each
+section matches its animation_dur without another synthesis pass.
+
+--draft makes no TTS requests: chunks missing from the cache become
+silence of their predicted length, and the files go to narration/draft/
+for the proxy cut (see animations/draft.py).
 
 Usage:
     python animations/ch1/generate_narration.py
     python animations/ch1/generate_narration.py --voice en-US-GuyNeural
     python animations/ch1/generate_narration.py --rate "+10%"
+    python animations/ch1/generate_narration.py --draft
 
 Output: animations/ch1/narration/<section>.mp3
 """
@@ -17,65 +29,73 @@ import asyncio
 import argparse
 import os
 import re
-import subprocess
-import tempfile
-import edge_tts
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from narration import (CONCURRENCY, SAMPLE_RATE, DurationModel, allocate_pauses, assemble,
+                       cached_paths, encode_mp3, load_pcm, plan_section, silence,
+                       synthesize_all)
+from render import scene_durations
 
 SCRIPT_PATH = "animations/ch1/script.md"
 NARRATION_DIR = "animations/ch1/narration"
+CHAPTER = "ch1"
 
 # ── Section definitions ──────────────────────────────────────────
 # Each section maps to an animation clip. We extract the narrator
 # text and pair it with the target animation duration so the TTS
-# rate can be adjusted per-section to roughly match.
+# rates and pauses can be fitted to it.
 #
-# animation_dur is the clip duration in seconds (0 = no animation)
+# animation_dur is the clip duration in seconds (0 = no animation). Once
+# the scenes have been rendered with animations/render.py, the rendered clip
+# lengths of the listed scenes are used instead.
 SECTION_DEFS = [
-    # (section_id, script_start, script_end, animation_dur)
+    # (section_id, script_start, script_end, animation_dur, scenes)
     ("part1_opening",
      "### 1.1 Opening Hook",
      "### 1.2 The Response Matrix",
-     57.9),  # ChapterOpening (6.6s) + OpeningHook (51.3s)
+     57.9, ("ChapterOpening", "OpeningHook")),
 
     ("part1_response_matrix",
      "### 1.2 The Response Matrix",
      "## PART 2",
-     47.8),  # Part1Title (4.6s) + ResponseMatrixSort (43.2s)
+     47.8, ("Part1Title", "ResponseMatrixSort")),
 
     ("part2_icc_models",
      "### 2.1 The Rasch Model",
      "## PART 3",
-     115.0),  # Part2Title (4.6s) + ICCModels (110.4s)
+     115.0, ("Part2Title", "ICCModels")),
 
     ("part3_sufficiency",
      "### 3.1 Sufficiency",
      "### 3.2 Specific Objectivity",
-     59.3),  # Part3Title (4.6s) + Sufficiency (54.7s)
+     59.3, ("Part3Title", "Sufficiency")),
 
     ("part3_specific_objectivity",
      "### 3.2 Specific Objectivity",
      "## PART 4",
-     71.8),  # SpecificObjectivity (71.8s, no title)
+     71.8, ("SpecificObjectivity",)),
 
     ("part4_elo",
      "### 4.1 Paired Comparisons",
      "### 4.2 What Causes",
-     56.8),  # Part4Title (4.6s) + EloDynamics (52.2s)
+     56.8, ("Part4Title", "EloDynamics")),
 
     ("part4_latent_vs_network",
      "### 4.2 What Causes",
      "## PART 5",
-     67.5),  # LatentVsNetwork (67.5s, no title)
+     67.5, ("LatentVsNetwork",)),
 
     ("part5_factor_model",
      "### 5.1 Factor Models",
      "## PART 6",
-     61.6),  # Part5Title (4.6s) + FactorModel (57.0s)
+     61.6, ("Part5Title", "FactorModel")),
 
     ("part6_closing",
      "### 6.1 Summary",
      "## Animation-Scene Mapping",
-     62.7),  # ChapterClosing (62.7s)
+     62.7, ("ChapterClosing",)),
 ]
 
 
@@ -163,112 +183,54 @@ def parse_narration(text: str) -> list[dict]:
     return chunks
 
 
-def get_audio_duration(path: str) -> float:
-    result = subprocess.run(
-        ["ffprobe", "-v", "quiet", "-show_entries", "format=duration",
-         "-of", "default=noprint_wrappers=1:nokey=1", path],
-        capture_output=True, text=True
-    )
-    return float(result.stdout.strip())
-
-
-def generate_silence(duration_s: float, output: str):
-    """Generate a silent audio file."""
-    subprocess.run(
-        ["ffmpeg", "-y", "-f", "lavfi", "-i",
-         f"anullsrc=r=24000:cl=mono",
-         "-t", str(duration_s), "-c:a", "libmp3lame", "-q:a", "9",
-         output],
-        capture_output=True
-    )
-
-
-async def generate_tts(text: str, voice: str, rate: str, output: str):
-    communicate = edge_tts.Communicate(text, voice, rate=rate)
-    await communicate.save(output)
-
-
-async def build_section(section_id: str, chunks: list[dict],
-                        voice: str, rate: str, tmpdir: str, output: str):
-    """Build a single section audio file from text chunks + silence gaps."""
-    part_files = []
-    idx = 0
+def build_section(chunks: list[dict], tts_paths: dict, voice: str, target_dur: float,
+                  output: str, model: DurationModel = None) -> float:
+    """Assemble a section from cached TTS PCM + silent gaps and encode it once.
 
+    The pauses are re-allocated from the decoded chunk lengths first, so the
+    section lands on target_dur. With a model, chunks missing from tts_paths
+    are replaced by silence of their predicted length (draft narration).
+    Returns the section duration in seconds.
+    """
+    speech = {}
+    for c in chunks:
+        if c["type"] != "text":
+            continue
+        request = (c["content"], voice, c["rate"])
+        if request in tts_paths or model is None:
+            speech[id(c)] = load_pcm(tts_paths[request])
+        else:
+            speech[id(c)] = silence(model.predict(*request))
+    allocate_pauses(chunks, sum(len(pcm) for pcm in speech.values()) / SAMPLE_RATE,
+                    target_dur)
+
+    parts = []
     for chunk in chunks:
         if chunk["type"] == "pause":
-            dur_s = chunk["duration_ms"] / 1000.0
-            silence_path = os.path.join(tmpdir, f"{section_id}_{idx:03d}_silence.mp3")
-            generate_silence(dur_s, silence_path)
-            part_files.append(silence_path)
-
+            parts.append(silence(chunk["duration_ms"] / 1000.0))
         elif chunk["type"] == "text":
-            tts_path = os.path.join(tmpdir, f"{section_id}_{idx:03d}_tts.mp3")
-            await generate_tts(chunk["content"], voice, rate, tts_path)
-            part_files.append(tts_path)
-
-        idx += 1
-
-    if not part_files:
-        return
-
-    # Concatenate all chunks
-    concat_list = os.path.join(tmpdir, f"{section_id}_concat.txt")
-    with open(concat_list, "w") as f:
-        for pf in part_files:
-            f.write(f"file '{pf}'\n")
+            parts.append(speech[id(chunk)])
 
-    subprocess.run(
-        ["ffmpeg", "-y", "-f", "concat", "-safe", "0",
-         "-i", concat_list, "-c:a", "libmp3lame", "-q:a", "2",
-         output],
-        capture_output=True
-    )
+    pcm = assemble(parts)
+    if len(pcm) == 0:
+        return 0.0
+    encode_mp3(pcm, output)
+    return len(pcm) / SAMPLE_RATE
 
 
-def estimate_rate(text_chunks: list[dict], target_dur: float,
-                  base_wpm: float = 155) -> str:
-    """Estimate a TTS rate adjustment to fit narration into target duration.
-
-    base_wpm: typical speaking rate for edge-tts at +0%.
-    Returns a rate string like "+15%" or "+30%".
-    """
-    # Count words in text chunks
-    words = sum(
-        len(c["content"].split())
-        for c in text_chunks if c["type"] == "text"
-    )
-    # Count pause time
-    pause_s = sum(
-        c["duration_ms"] / 1000.0
-        for c in text_chunks if c["type"] == "pause"
-    )
-
-    if words == 0 or target_dur <= 0:
-        return "+0%"
-
-    # Time available for speech
-    speech_time = max(target_dur - pause_s, 10)
-
-    # Required WPM
-    required_wpm = (words / speech_time) * 60
-
-    # Rate adjustment as percentage
-    rate_pct = ((required_wpm / base_wpm) - 1) * 100
-
-    # Clamp to reasonable range: don't go slower than -10% or faster than +60%
-    rate_pct = max(-10, min(60, rate_pct))
-
-    sign = "+" if rate_pct >= 0 else ""
-    return f"{sign}{int(rate_pct)}%"
-
-
-def main():
+def main(synthesizer=None):
     parser = argparse.ArgumentParser()
     parser.add_argument("--voice", default="en-US-AndrewNeural")
     parser.add_argument("--rate", default=None,
                         help="Fixed rate (overrides auto-fit). e.g. '+10%%'")
-    parser.add_argument("--output-dir", default=NARRATION_DIR)
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--jobs", type=int, default=CONCURRENCY,
+                        help="Concurrent TTS requests")
+    parser.add_argument("--draft", action="store_true",
+                        help="No TTS requests: uncached chunks become placeholder silence")
     args = parser.parse_args()
+    if args.output_dir is None:
+        args.output_dir = os.path.join(NARRATION_DIR, "draft") if args.draft else NARRATION_DIR
 
     with open(SCRIPT_PATH) as f:
         content = f.read()
@@ -279,33 +241,56 @@ def main():
     print(f"Rate: {'auto-fit' if args.rate is None else args.rate}")
     print()
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        for section_id, start, end, anim_dur in SECTION_DEFS:
-            raw = extract_between(content, start, end)
-            chunks = parse_narration(raw)
-
-            words = sum(len(c["content"].split())
-                        for c in chunks if c["type"] == "text")
-
-            # Determine rate
-            if args.rate is not None:
-                rate = args.rate
-            else:
-                rate = estimate_rate(chunks, anim_dur)
-
-            output = os.path.join(args.output_dir, f"{section_id}.mp3")
-            print(f"── {section_id}")
-            print(f"   {words} words, animation={anim_dur}s, rate={rate}")
-
-            asyncio.run(build_section(
-                section_id, chunks, args.voice, rate, tmpdir, output
-            ))
-
-            dur = get_audio_duration(output)
-            diff = dur - anim_dur
-            fit = "OK" if abs(diff) < 5 else ("LONG" if diff > 0 else "SHORT")
-            print(f"   -> {dur:.1f}s (delta={diff:+.1f}s) [{fit}]")
-            print()
+    model = DurationModel.fit()
+    print(f"Duration model: {model.samples.get(args.voice, 0)} cached chunks for this voice"
+          f" ({'fitted' if args.voice in model.coefs else 'prior'})")
+    print()
+
+    # Parse every section and plan its rates first, so the TTS requests of
+    # the whole chapter can be issued together
+    sections = []
+    rendered = {**scene_durations(CHAPTER, "l"), **scene_durations(CHAPTER)}
+    for section_id, start, end, anim_dur, scenes in SECTION_DEFS:
+        if scenes and all(scene in rendered for scene in scenes):
+            anim_dur = round(sum(rendered[scene] for scene in scenes), 1)
+        raw = extract_between(content, start, end)
+        chunks = parse_narration(raw)
+        predicted = plan_section(chunks, anim_dur, args.voice, model, args.rate)
+        sections.append((section_id, chunks, anim_dur, predicted))
+
+    requests = [(c["content"], args.voice, c["rate"])
+                for _, chunks, _, _ in sections for c in chunks if c["type"] == "text"]
+    if args.draft:
+        tts_paths = cached_paths(requests)
+        print(f"TTS: {len(tts_paths)} of {len(set(requests))} chunks cached, "
+              f"the rest are placeholders")
+    else:
+        tts_paths, n_new = asyncio.run(synthesize_all(requests, synthesizer,
+                                                      concurrency=args.jobs))
+        print(f"TTS: {len(tts_paths)} chunks, {n_new} synthesized, "
+              f"{len(tts_paths) - n_new} from cache")
+    print()
+
+    # Decode every chunk once, then assemble and encode the sections in parallel
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        list(pool.map(load_pcm, tts_paths.values()))
+        futures = [pool.submit(build_section, chunks, tts_paths, args.voice, anim_dur,
+                               os.path.join(args.output_dir, f"{section_id}.mp3"),
+                               model if args.draft else None)
+                   for section_id, chunks, anim_dur, _ in sections]
+        durations = [future.result() for future in futures]
+
+    for (section_id, chunks, anim_dur, predicted), dur in zip(sections, durations):
+        words = sum(len(c["content"].split())
+                    for c in chunks if c["type"] == "text")
+        rates = sorted({c["rate"] for c in chunks if c["type"] == "text"})
+        print(f"── {section_id}")
+        print(f"   {words} words, animation={anim_dur}s, rates={', '.join(rates) or '-'}, "
+              f"predicted={predicted:.1f}s")
+        diff = dur - anim_dur
+        fit = "OK" if abs(diff) < 5 else ("LONG" if diff > 0 else "SHORT")
+        print(f"   -> {dur:.1f}s (delta={diff:+.1f}s) [{fit}]")
+        print()
 
     print("Done! Files in", args.output_dir)
 
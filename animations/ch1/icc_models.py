@@ -9,9 +9,15 @@ Run with:
     manim -qh --disable_caching --media_dir media/ch1 animations/ch1/icc_models.py ICCModels
 """
 
+import os
+import sys
+
 from manim import *
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sections import play_sections
+
 
 def sigmoid(x):
     return 1 / (1 + np.exp(-x))
@@ -32,12 +38,8 @@ class ICCModels(Scene):
     def construct(self):
         self.camera.background_color = BG_COLOR
 
-        self.play_title()
-        self.play_rasch()
-        self.play_2pl()
-        self.play_3pl()
-        self.play_comparison()
-        self.play_closing()
+        play_sections(self, "play_title", "play_rasch", "play_2pl", "play_3pl",
+                      "play_comparison", "play_closing")
 
     # ================================================================
     #  HELPERS
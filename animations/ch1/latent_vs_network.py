@@ -7,9 +7,15 @@ Run with:
     manim -qh --disable_caching --media_dir media/ch1 animations/ch1/latent_vs_network.py LatentVsNetwork
 """
 
+import os
+import sys
+
 from manim import *
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sections import play_sections
+
 # ── design tokens ───────────────────────────────────────────────────
 ACCENT = "#FFD966"
 BG = "#0f0f0f"
@@ -24,12 +30,8 @@ NETWORK_CLR = PAL[2]
 class LatentVsNetwork(Scene):
     def construct(self):
         self.camera.background_color = BG
-        self.play_title()
-        self.play_observation()
-        self.play_latent_variable()
-        self.play_network()
-        self.play_side_by_side()
-        self.play_takeaway()
+        play_sections(self, "play_title", "play_observation", "play_latent_variable",
+                      "play_network", "play_side_by_side", "play_takeaway")
 
     # ── title ───────────────────────────────────────────────────────
     def play_title(self):
@@ -2,11 +2,15 @@
 AIMS Chapter 1 — Section title cards & chapter bookends.
 These short clips are stitched between the content animations.
 
-Run with:
-    PATH="/lfs/local/0/sttruong/miniconda3/bin:$PATH" \
-    manim -qh --disable_caching --media_dir media/ch1 animations/ch1/section_titles.py <Scene>
+The chapter opening and part cards are static, so they are data (CARDS):
+animations/title_cards.py renders each one's final frame once from
+animations/title_card_template.py and makes the fades and holds in the
+encoder. Only ChapterClosing, whose takeaways build up over a minute, is a
+Manim scene. All of them are built with:
 
-Scenes (render in order):
+    python animations/render.py ch1
+
+Cards (in order):
     ChapterOpening
     Part1Title
     Part2Title
@@ -31,132 +35,25 @@ class _TitleBase(Scene):
     def construct(self):
         self.camera.background_color = BG
 
-    def make_part_card(self, part_num, part_title, subtitle, color):
-        """Animate a 'Part N' title card with accent line."""
-        part_lbl = Text(
-            f"Part {part_num}", font_size=22, color=TEXT2,
-        )
-        part_lbl.shift(UP * 0.8)
-
-        title = Text(
-            part_title, font_size=44, color=color, weight=BOLD,
-        )
-        title.next_to(part_lbl, DOWN, buff=0.3)
-
-        line = Line(LEFT * 2, RIGHT * 2, color=ACCENT, stroke_width=1.5)
-        line.next_to(title, DOWN, buff=0.3)
-
-        sub = Text(subtitle, font_size=22, color=TEXT2)
-        sub.next_to(line, DOWN, buff=0.3)
-
-        # Animate in
-        self.play(FadeIn(part_lbl, shift=DOWN * 0.1), run_time=0.5)
-        self.play(FadeIn(title, shift=DOWN * 0.15), run_time=0.7)
-        self.play(Create(line), run_time=0.4)
-        self.play(FadeIn(sub, shift=UP * 0.1), run_time=0.5)
-        self.wait(1.5)
-
-        # Animate out
-        group = VGroup(part_lbl, title, line, sub)
-        self.play(FadeOut(group), run_time=0.7)
-        self.wait(0.3)
-
-
-# ════════════════════════════════════════════════════════════════════
-#  CHAPTER OPENING
-# ════════════════════════════════════════════════════════════════════
-
-class ChapterOpening(_TitleBase):
-    def construct(self):
-        super().construct()
-
-        # Chapter number
-        ch = Text("Chapter 1", font_size=24, color=TEXT2)
-        ch.shift(UP * 1.2)
-
-        # Title
-        title = Text(
-            "Foundations of Measurement",
-            font_size=52, color=WHITE, weight=BOLD,
-        )
-        title.next_to(ch, DOWN, buff=0.35)
-
-        # Accent line
-        line = Line(LEFT * 3, RIGHT * 3, color=ACCENT, stroke_width=2)
-        line.next_to(title, DOWN, buff=0.35)
-
-        # Subtitle
-        sub = Text(
-            "AI Measurement Science",
-            font_size=28, color=ACCENT,
-        )
-        sub.next_to(line, DOWN, buff=0.35)
-
-        # Animate
-        self.play(FadeIn(ch, shift=DOWN * 0.1), run_time=0.6)
-        self.play(FadeIn(title, shift=DOWN * 0.15), run_time=1.0)
-        self.play(Create(line), run_time=0.5)
-        self.play(FadeIn(sub, shift=UP * 0.1), run_time=0.7)
-        self.wait(2.5)
-        self.play(
-            *[FadeOut(m) for m in self.mobjects],
-            run_time=0.8,
-        )
-        self.wait(0.5)
-
 
 # ════════════════════════════════════════════════════════════════════
-#  PART TITLE CARDS
+#  CHAPTER OPENING & PART TITLE CARDS (stills, see animations/title_cards.py)
 # ════════════════════════════════════════════════════════════════════
 
-class Part1Title(_TitleBase):
-    def construct(self):
-        super().construct()
-        self.make_part_card(
-            1, "The Problem",
-            "Scoring vs. measuring",
-            PAL[0],
-        )
-
-
-class Part2Title(_TitleBase):
-    def construct(self):
-        super().construct()
-        self.make_part_card(
-            2, "The Models",
-            "Item Response Theory: 1PL, 2PL, 3PL",
-            PAL[1],
-        )
-
-
-class Part3Title(_TitleBase):
-    def construct(self):
-        super().construct()
-        self.make_part_card(
-            3, "Why Rasch Is Special",
-            "Sufficiency and specific objectivity",
-            PAL[2],
-        )
-
-
-class Part4Title(_TitleBase):
-    def construct(self):
-        super().construct()
-        self.make_part_card(
-            4, "Beyond Item Response",
-            "Paired comparisons and network models",
-            PAL[3],
-        )
-
-
-class Part5Title(_TitleBase):
-    def construct(self):
-        super().construct()
-        self.make_part_card(
-            5, "Multidimensionality",
-            "Factor models and benchmark heterogeneity",
-            PAL[4],
-        )
+CARDS = {
+    "ChapterOpening": {"kind": "opening", "chapter": "Chapter 1",
+                       "title": "Foundations of Measurement", "subtitle": "AI Measurement Science"},
+    "Part1Title": {"kind": "part", "number": 1, "title": "The Problem",
+                   "subtitle": "Scoring vs. measuring", "color": PAL[0]},
+    "Part2Title": {"kind": "part", "number": 2, "title": "The Models",
+                   "subtitle": "Item Response Theory: 1PL, 2PL, 3PL", "color": PAL[1]},
+    "Part3Title": {"kind": "part", "number": 3, "title": "Why Rasch Is Special",
+                   "subtitle": "Sufficiency and specific objectivity", "color": PAL[2]},
+    "Part4Title": {"kind": "part", "number": 4, "title": "Beyond Item Response",
+                   "subtitle": "Paired comparisons and network models", "color": PAL[3]},
+    "Part5Title": {"kind": "part", "number": 5, "title": "Multidimensionality",
+                   "subtitle": "Factor models and benchmark heterogeneity", "color": PAL[4]},
+}
 
 
 # ════════════════════════════════════════════════════════════════════
@@ -7,9 +7,15 @@ Run with:
     manim -qh --disable_caching --media_dir media/ch1 animations/ch1/specific_objectivity.py SpecificObjectivity
 """
 
+import os
+import sys
+
 from manim import *
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sections import play_sections
+
 # ── design tokens ───────────────────────────────────────────────────
 ACCENT = "#FFD966"
 BG = "#0f0f0f"
@@ -29,12 +35,8 @@ def sigmoid(x):
 class SpecificObjectivity(Scene):
     def construct(self):
         self.camera.background_color = BG
-        self.play_title()
-        self.play_setup()
-        self.play_algebra()
-        self.play_visual_proof()
-        self.play_counterexample()
-        self.play_takeaway()
+        play_sections(self, "play_title", "play_setup", "play_algebra", "play_visual_proof",
+                      "play_counterexample", "play_takeaway")
 
     # ── title ───────────────────────────────────────────────────────
     def play_title(self):
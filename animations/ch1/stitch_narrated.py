@@ -0,0 +1,64 @@
+"""
+Build the narrated Chapter 1 video.
+
+Combines per-section narration audio with the title cards and animation
+clips. When narration is longer than the clips, the last frame freezes;
+when there is no animation (closing), the title card is extended. Segments
+are encoded once each and cached (see animations/stitching.py), so after a
+narration edit only the affected section is re-encoded.
+
+Usage:
+    python animations/ch1/stitch_narrated.py
+    python animations/ch1/stitch_narrated.py --music animations/music/chopin_nocturne_op9_no2.mp3
+
+Output: animations/ch1/chapter1_narrated.mp4
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stitching import main
+
+MEDIA = "media/ch1/videos"
+NAR = "animations/ch1/narration"
+TITLES = f"{MEDIA}/section_titles/1080p60"
+OUTPUT = "animations/ch1/chapter1_narrated.mp4"
+
+# ── Section definitions ──────────────────────────────────────────
+# (section_id, title_card_video, animation_video, narration_audio),
+# paths relative to the repo root; None if a section has no title card
+# or no animation.
+SECTIONS = [
+    ("opening", f"{TITLES}/ChapterOpening.mp4",
+     f"{MEDIA}/opening_hook/1080p60/OpeningHook.mp4",
+     f"{NAR}/part1_opening.mp3"),
+    ("part1",   f"{TITLES}/Part1Title.mp4",
+     f"{MEDIA}/response_matrix/1080p60/ResponseMatrixSort.mp4",
+     f"{NAR}/part1_response_matrix.mp3"),
+    ("part2",   f"{TITLES}/Part2Title.mp4",
+     f"{MEDIA}/icc_models/1080p60/ICCModels.mp4",
+     f"{NAR}/part2_icc_models.mp3"),
+    ("part3a",  f"{TITLES}/Part3Title.mp4",
+     f"{MEDIA}/sufficiency/1080p60/Sufficiency.mp4",
+     f"{NAR}/part3_sufficiency.mp3"),
+    ("part3b",  None,
+     f"{MEDIA}/specific_objectivity/1080p60/SpecificObjectivity.mp4",
+     f"{NAR}/part3_specific_objectivity.mp3"),
+    ("part4a",  f"{TITLES}/Part4Title.mp4",
+     f"{MEDIA}/elo_dynamics/1080p60/EloDynamics.mp4",
+     f"{NAR}/part4_elo.mp3"),
+    ("part4b",  None,
+     f"{MEDIA}/latent_vs_network/1080p60/LatentVsNetwork.mp4",
+     f"{NAR}/part4_latent_vs_network.mp3"),
+    ("part5",   f"{TITLES}/Part5Title.mp4",
+     f"{MEDIA}/factor_model/1080p60/FactorModel.mp4",
+     f"{NAR}/part5_factor_model.mp3"),
+    ("closing", f"{TITLES}/ChapterClosing.mp4",
+     None,
+     f"{NAR}/part6_closing.mp3"),
+]
+
+
+if __name__ == "__main__":
+    main(SECTIONS, OUTPUT)
@@ -8,9 +8,15 @@ Run with:
     manim -qh --disable_caching --media_dir media/ch1 animations/ch1/sufficiency.py Sufficiency
 """
 
+import os
+import sys
+
 from manim import *
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sections import play_sections
+
 # ── design tokens ───────────────────────────────────────────────────
 ACCENT = "#FFD966"
 BG = "#0f0f0f"
@@ -32,11 +38,8 @@ def sigmoid(x):
 class Sufficiency(Scene):
     def construct(self):
         self.camera.background_color = BG
-        self.play_title()
-        self.play_patterns()
-        self.play_rasch_merge()
-        self.play_2pl_break()
-        self.play_takeaway()
+        play_sections(self, "play_title", "play_patterns", "play_rasch_merge", "play_2pl_break",
+                      "play_takeaway")
 
     # ── title ───────────────────────────────────────────────────────
     def play_title(self):
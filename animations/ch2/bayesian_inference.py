@@ -7,9 +7,15 @@ Run with:
     manim -qh --disable_caching --media_dir media/ch2 animations/ch2/bayesian_inference.py BayesianInference
 """
 
+import os
+import sys
+
 from manim import *
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sections import play_sections
+
 # ── design tokens ────────────────────────────────────────────────
 ACCENT = "#FFD966"
 BG = "#0f0f0f"
@@ -29,10 +35,7 @@ class BayesianInference(Scene):
 
     def construct(self):
         self.camera.background_color = BG
-        self.play_title()
-        self.play_triptych()
-        self.play_extreme_case()
-        self.play_takeaway()
+        play_sections(self, "play_title", "play_triptych", "play_extreme_case", "play_takeaway")
 
     # ================================================================
     #  Title
@@ -7,9 +7,15 @@ Run with:
     manim -qh --disable_caching --media_dir media/ch2 animations/ch2/cat_simulation.py CATSimulation
 """
 
+import os
+import sys
+
 from manim import *
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sections import play_sections
+
 # ── design tokens ────────────────────────────────────────────────
 ACCENT = "#FFD966"
 BG = "#0f0f0f"
@@ -30,11 +36,8 @@ class CATSimulation(Scene):
     def construct(self):
         self.camera.background_color = BG
         np.random.seed(42)
-        self.play_title()
-        self.play_fisher_information()
-        self.play_cat_steps()
-        self.play_comparison()
-        self.play_takeaway()
+        play_sections(self, "play_title", "play_fisher_information", "play_cat_steps",
+                      "play_comparison", "play_takeaway")
 
     # ================================================================
     #  Title
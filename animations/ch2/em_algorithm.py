@@ -8,9 +8,15 @@ Run with:
     manim -qh --disable_caching --media_dir media/ch2 animations/ch2/em_algorithm.py EMAlgorithm
 """
 
+import os
+import sys
+
 from manim import *
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sections import play_sections
+
 # ── design tokens ────────────────────────────────────────────────
 ACCENT = "#FFD966"
 BG = "#0f0f0f"
@@ -30,12 +36,8 @@ class EMAlgorithm(Scene):
 
     def construct(self):
         self.camera.background_color = BG
-        self.play_title()
-        self.play_cycle_diagram()
-        self.play_e_step()
-        self.play_m_step()
-        self.play_iteration()
-        self.play_takeaway()
+        play_sections(self, "play_title", "play_cycle_diagram", "play_e_step", "play_m_step",
+                      "play_iteration", "play_takeaway")
 
     # ================================================================
     #  Title
@@ -8,9 +8,15 @@ Run with:
     manim -qh --disable_caching --media_dir media/ch2 animations/ch2/identifiability.py Identifiability
 """
 
+import os
+import sys
+
 from manim import *
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sections import play_sections
+
 # ── design tokens ────────────────────────────────────────────────
 ACCENT = "#FFD966"
 BG = "#0f0f0f"
@@ -22,10 +28,8 @@ AXIS_CLR = "#888888"
 class Identifiability(Scene):
     def construct(self):
         self.camera.background_color = BG
-        self.play_title()
-        self.play_number_line_shift()
-        self.play_algebra()
-        self.play_solution()
+        play_sections(self, "play_title", "play_number_line_shift", "play_algebra",
+                      "play_solution")
 
     # ================================================================
     #  Title
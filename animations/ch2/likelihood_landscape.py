@@ -8,9 +8,15 @@ Run with:
     manim -qh --disable_caching --media_dir media/ch2 animations/ch2/likelihood_landscape.py LikelihoodLandscape
 """
 
+import os
+import sys
+
 from manim import *
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sections import play_sections
+
 # ── design tokens ────────────────────────────────────────────────
 ACCENT = "#FFD966"
 BG = "#0f0f0f"
@@ -30,10 +36,8 @@ class LikelihoodLandscape(Scene):
 
     def construct(self):
         self.camera.background_color = BG
-        self.play_title()
-        self.play_single_item_likelihood()
-        self.play_gradient_convergence()
-        self.play_parameter_recovery()
+        play_sections(self, "play_title", "play_single_item_likelihood",
+                      "play_gradient_convergence", "play_parameter_recovery")
 
     # ================================================================
     #  Helpers (matching ch1 icc_models.py style)
@@ -8,9 +8,15 @@ Run with:
     manim -qh --disable_caching --media_dir media/ch2 animations/ch2/opening_hook.py OpeningHook
 """
 
+import os
+import sys
+
 from manim import *
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sections import play_sections
+
 # ── design tokens ────────────────────────────────────────────────
 ACCENT = "#FFD966"
 BG = "#0f0f0f"
@@ -28,9 +34,7 @@ def sigmoid(x):
 class OpeningHook(Scene):
     def construct(self):
         self.camera.background_color = BG
-        self.play_recap()
-        self.play_question()
-        self.play_landscape_preview()
+        play_sections(self, "play_recap", "play_question", "play_landscape_preview")
 
     # ================================================================
     #  Act 1: Recap from Chapter 1
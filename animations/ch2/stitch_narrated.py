@@ -0,0 +1,58 @@
+"""
+Build the narrated Chapter 2 video.
+
+Combines per-section narration audio with the title cards and animation
+clips. When narration is longer than the clips, the last frame freezes;
+when there is no animation (closing), the title card is extended. Segments
+are encoded once each and cached (see animations/stitching.py), so after a
+narration edit only the affected section is re-encoded.
+
+Usage:
+    python animations/ch2/stitch_narrated.py
+    python animations/ch2/stitch_narrated.py --music animations/music/chopin_nocturne_op9_no2.mp3
+
+Output: animations/ch2/chapter2_narrated.mp4
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stitching import main
+
+MEDIA = "media/ch2/videos"
+NAR = "animations/ch2/narration"
+TITLES = f"{MEDIA}/section_titles/1080p60"
+OUTPUT = "animations/ch2/chapter2_narrated.mp4"
+
+# ── Section definitions ──────────────────────────────────────────
+# (section_id, title_card_video, animation_video, narration_audio),
+# paths relative to the repo root; None if a section has no title card
+# or no animation.
+SECTIONS = [
+    ("opening", f"{TITLES}/ChapterOpening.mp4",
+     f"{MEDIA}/opening_hook/1080p60/OpeningHook.mp4",
+     f"{NAR}/part1_opening.mp3"),
+    ("part1",   f"{TITLES}/Part1Title.mp4",
+     f"{MEDIA}/likelihood_landscape/1080p60/LikelihoodLandscape.mp4",
+     f"{NAR}/part1_likelihood.mp3"),
+    ("part2",   f"{TITLES}/Part2Title.mp4",
+     f"{MEDIA}/identifiability/1080p60/Identifiability.mp4",
+     f"{NAR}/part2_identifiability.mp3"),
+    ("part3",   f"{TITLES}/Part3Title.mp4",
+     f"{MEDIA}/em_algorithm/1080p60/EMAlgorithm.mp4",
+     f"{NAR}/part3_em.mp3"),
+    ("part4",   f"{TITLES}/Part4Title.mp4",
+     f"{MEDIA}/bayesian_inference/1080p60/BayesianInference.mp4",
+     f"{NAR}/part4_bayesian.mp3"),
+    ("part5",   f"{TITLES}/Part5Title.mp4",
+     f"{MEDIA}/cat_simulation/1080p60/CATSimulation.mp4",
+     f"{NAR}/part5_cat.mp3"),
+    ("closing", f"{TITLES}/ChapterClosing.mp4",
+     None,
+     f"{NAR}/part6_closing.mp3"),
+]
+
+
+if __name__ == "__main__":
+    main(SECTIONS, OUTPUT)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Narrated proxy cut of a chapter video, for review.
+
+Chains the three production steps with cheap settings:
+
+    render      render.py --quality l           480p15 scenes, cached per scene/section
+    narration   chN/generate_narration.py --draft   cached TTS only, silence for the rest
+    stitch      chN/stitch_narrated.py --draft      ultrafast 480p15 encode, cached segments
+
+Output: animations/chN/chapterN_narrated_draft.mp4. Sections whose scenes
+or narration already exist at full quality use them (scaled down), so the
+proxy cut turns into the final one section by section as full-quality
+renders and real narration arrive.
+
+Usage:
+    python animations/draft.py ch2
+    python animations/draft.py ch1 --jobs 4 --skip-narration
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+from render import ANIMATIONS_DIR, JOBS, ROOT, render_chapter
+
+
+def run(step, cmd):
+    start = time.perf_counter()
+    print(f"── {step}")
+    code = subprocess.run(cmd, cwd=ROOT).returncode
+    if code != 0:
+        raise SystemExit(f"{step} failed (exit {code})")
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a low-resolution narrated proxy cut.")
+    parser.add_argument("chapter", help="Chapter directory under animations/, e.g. ch2")
+    parser.add_argument("--jobs", type=int, default=JOBS)
+    parser.add_argument("--skip-narration", action="store_true",
+                        help="Keep the existing draft narration files")
+    args = parser.parse_args()
+
+    chapter_dir = ANIMATIONS_DIR / args.chapter
+    timings = {}
+
+    start = time.perf_counter()
+    print("── render (480p15)")
+    rows = render_chapter(args.chapter, quality="l", jobs=args.jobs)
+    if any(status == "FAILED" for _, status, _ in rows):
+        raise SystemExit("render failed")
+    timings["render"] = time.perf_counter() - start
+
+    if not args.skip_narration:
+        timings["narration"] = run("narration (draft)", [
+            sys.executable, str(chapter_dir / "generate_narration.py"), "--draft"])
+    timings["stitch"] = run("stitch (draft)", [
+        sys.executable, str(chapter_dir / "stitch_narrated.py"), "--draft",
+        "--jobs", str(args.jobs)])
+
+    print()
+    for step, seconds in timings.items():
+        print(f"  {step:<10} {seconds:7.1f}s")
+    print(f"  {'total':<10} {sum(timings.values()):7.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+Shared TTS machinery for the chapter narration scripts.
+
+animations/chN/generate_narration.py keeps the chapter-specific parts
+(SECTION_DEFS, pronunciation fixes); this module synthesizes the text
+chunks of all sections concurrently and caches each one on disk.
+
+Cache layout (content-addressed by text, voice and rate):
+
+    animations/.tts_cache/
+        <sha256>.mp3    synthesized audio
+        <sha256>.json   text, voice, rate and word boundaries
+        <sha256>.pcm    decoded 16-bit mono PCM (written on first use)
+
+Editing one sentence of a script therefore re-synthesizes only that chunk.
+The synthesizer is any object with an async
+``synthesize(text, voice, rate) -> (mp3_bytes, boundaries)`` method;
+``EdgeTTS`` is the default, and tests can pass a local stand-in instead.
+
+Sections are assembled in memory: every TTS chunk is decoded to PCM once
+(and the PCM is cached), pauses are zero-filled buffers, and the
+concatenated section is encoded with a single ffmpeg call.
+
+Fitting a section to its animation uses a duration model fitted on the
+cache itself (PCM lengths, or word boundaries where no PCM exists yet):
+``plan_section`` picks an integer rate per chunk and scales the scripted
+pauses so the predicted length matches the clip, and ``allocate_pauses``
+re-scales the pauses with the real chunk durations after synthesis. A
+section therefore lands on its target in one synthesis pass. Chunks whose
+text is already cached keep their cached rate, so that editing one sentence
+re-plans (and re-synthesizes) only that chunk.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+# Configuration
+CACHE_DIR = Path(os.environ.get("AIMS_TTS_CACHE", Path(__file__).parent / ".tts_cache"))
+CONCURRENCY = 8  # Simultaneous TTS requests across all sections
+SAMPLE_RATE = 24000  # edge-tts output rate; PCM is mono int16 at this rate
+RATE_RANGE = (-10, 60)  # Per-chunk rate bounds in percent (the former estimate_rate clamp)
+PAUSE_SCALE = (0.5, 3.0)  # Pauses may shrink to half or grow to 3x their scripted length
+REPLAN_TOLERANCE = 2.0  # Seconds off target that cached rates may leave before a full re-plan
+PRIOR_WPS = 155 / 60  # Words per second at +0% before any chunk is cached
+MIN_FIT_SAMPLES = 8  # Cached chunks per voice needed to fit the model
+
+
+def chunk_key(text: str, voice: str, rate: str) -> str:
+    return hashlib.sha256(json.dumps([text, voice, rate]).encode()).hexdigest()
+
+
+class EdgeTTS:
+    """edge-tts synthesizer that also returns word boundaries."""
+
+    async def synthesize(self, text: str, voice: str, rate: str):
+        import edge_tts
+
+        communicate = edge_tts.Communicate(text, voice, rate=rate)
+        audio = bytearray()
+        boundaries = []
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                audio.extend(chunk["data"])
+            elif chunk["type"] == "WordBoundary":
+                # Offsets and durations are in 100 ns ticks
+                boundaries.append([chunk["offset"] / 1e7, chunk["duration"] / 1e7,
+                                   chunk["text"]])
+        return bytes(audio), boundaries
+
+
+class TTSCache:
+    """On-disk cache of synthesized chunks keyed by (text, voice, rate)."""
+
+    def __init__(self, root=CACHE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def audio_path(self, text: str, voice: str, rate: str) -> Path:
+        return self.root / f"{chunk_key(text, voice, rate)}.mp3"
+
+    def meta_path(self, text: str, voice: str, rate: str) -> Path:
+        return self.root / f"{chunk_key(text, voice, rate)}.json"
+
+    def pcm_path(self, text: str, voice: str, rate: str) -> Path:
+        return self.root / f"{chunk_key(text, voice, rate)}.pcm"
+
+    def has(self, text: str, voice: str, rate: str) -> bool:
+        return (self.audio_path(text, voice, rate).exists()
+                and self.meta_path(text, voice, rate).exists())
+
+    def put(self, text: str, voice: str, rate: str, audio: bytes, boundaries: list) -> Path:
+        """Store a chunk (metadata last, so a partial write is never a hit)."""
+        path = self.audio_path(text, voice, rate)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(audio)
+        os.replace(tmp, path)
+        meta = {"text": text, "voice": voice, "rate": rate, "boundaries": boundaries}
+        self.meta_path(text, voice, rate).write_text(json.dumps(meta))
+        return path
+
+    def entries(self):
+        """Metadata of every cached chunk, with its write time as ``mtime``."""
+        for meta_path in self.root.glob("*.json"):
+            yield {**json.loads(meta_path.read_text()), "mtime": meta_path.stat().st_mtime}
+
+
+async def synthesize_all(requests, synthesizer=None, cache=None, concurrency=CONCURRENCY):
+    """
+    Make sure every (text, voice, rate) request is in the cache.
+
+    Missing chunks are synthesized concurrently, at most ``concurrency`` at a
+    time, regardless of which section they belong to.
+
+    Returns
+    -------
+    paths : dict mapping (text, voice, rate) -> cached mp3 path
+    n_synthesized : int
+    """
+    synthesizer = synthesizer or EdgeTTS()
+    cache = cache or TTSCache()
+    unique = list(dict.fromkeys(requests))
+    missing = [r for r in unique if not cache.has(*r)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def synthesize(request):
+        async with semaphore:
+            audio, boundaries = await synthesizer.synthesize(*request)
+        cache.put(*request, audio, boundaries)
+
+    await asyncio.gather(*(synthesize(r) for r in missing))
+    return {r: cache.audio_path(*r) for r in unique}, len(missing)
+
+
+def cached_paths(requests, cache=None) -> dict:
+    """Cached mp3 of every request that is already synthesized (no TTS calls)."""
+    cache = cache or TTSCache()
+    return {r: cache.audio_path(*r) for r in dict.fromkeys(requests) if cache.has(*r)}
+
+
+def load_pcm(mp3_path) -> np.ndarray:
+    """Decoded mono int16 samples of a cached chunk (decoded once, then cached)."""
+    pcm_path = Path(mp3_path).with_suffix(".pcm")
+    if not pcm_path.exists():
+        result = subprocess.run(
+            ["ffmpeg", "-v", "error", "-i", str(mp3_path),
+             "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+            capture_output=True, check=True,
+        )
+        tmp = pcm_path.with_suffix(".pcm.tmp")
+        tmp.write_bytes(result.stdout)
+        os.replace(tmp, pcm_path)
+    return np.fromfile(pcm_path, dtype=np.int16)
+
+
+def silence(duration_s: float) -> np.ndarray:
+    return np.zeros(int(round(duration_s * SAMPLE_RATE)), dtype=np.int16)
+
+
+def encode_mp3(pcm: np.ndarray, output, quality: int = 2):
+    """Encode int16 PCM to mp3 with one ffmpeg call (PCM is piped on stdin)."""
+    subprocess.run(
+        ["ffmpeg", "-y", "-v", "error", "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+         "-i", "pipe:0", "-c:a", "libmp3lame", "-q:a", str(quality), str(output)],
+        input=pcm.tobytes(), capture_output=True, check=True,
+    )
+
+
+def assemble(parts) -> np.ndarray:
+    """Concatenate PCM buffers (an empty list gives an empty buffer)."""
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int16)
+
+
+def rate_percent(rate: str) -> int:
+    return int(rate.rstrip("%"))
+
+
+def rate_string(percent: int) -> str:
+    return f"{percent:+d}%"
+
+
+def _features(text: str) -> list:
+    return [1.0, len(text.split()), len(text)]
+
+
+class DurationModel:
+    """
+    Predicts the spoken length of a chunk from its words and characters.
+
+    Each cached chunk gives a sample. Its duration at rate r% is normalized
+    to +0% by multiplying with (1 + r/100), and a per-voice least-squares fit
+    of seconds ~ 1 + words + characters is made on the normalized samples.
+    A per-(voice, rate) factor corrects for the rate scaling not being
+    exactly linear. Chunks already in the cache are never predicted: their
+    measured duration is used as is.
+    """
+
+    def __init__(self):
+        self.coefs = {}    # voice -> least-squares coefficients
+        self.factors = {}  # (voice, rate) -> median actual / predicted
+        self.known = {}    # (text, voice, rate) -> measured seconds
+        self.samples = {}  # voice -> number of cached chunks
+        self.rates = {}    # (text, voice) -> rate of the most recently cached take
+
+    @classmethod
+    def fit(cls, cache=None):
+        cache = cache or TTSCache()
+        model = cls()
+        measured, tails, latest = [], [], {}
+        for entry in sorted(cache.entries(), key=lambda e: e["mtime"]):
+            request = (entry["text"], entry["voice"], entry["rate"])
+            bounds = entry.get("boundaries") or []
+            speech_end = bounds[-1][0] + bounds[-1][1] if bounds else None
+            pcm = cache.pcm_path(*request)
+            duration = pcm.stat().st_size / 2 / SAMPLE_RATE if pcm.exists() else None
+            if duration is not None and speech_end is not None:
+                tails.append(duration - speech_end)
+            measured.append((request, duration, speech_end))
+
+        # Chunks never decoded: last word boundary plus the typical trailing silence
+        tail = float(np.median(tails)) if tails else 0.0
+        for request, duration, speech_end in measured:
+            if duration is None and speech_end is not None:
+                duration = speech_end + tail
+            if duration:
+                model.known[request] = duration
+                model.rates[request[:2]] = request[2]
+
+        by_voice = {}
+        for (text, voice, rate), duration in model.known.items():
+            by_voice.setdefault(voice, []).append((text, rate, duration))
+        for voice, rows in by_voice.items():
+            model.samples[voice] = len(rows)
+            if len(rows) < MIN_FIT_SAMPLES:
+                continue
+            X = np.array([_features(text) for text, _, _ in rows])
+            y = np.array([d * (1 + rate_percent(rate) / 100) for _, rate, d in rows])
+            model.coefs[voice] = np.linalg.lstsq(X, y, rcond=None)[0]
+            ratios = {}
+            for text, rate, duration in rows:
+                ratios.setdefault(rate, []).append(
+                    duration / max(model._base(text, voice) / (1 + rate_percent(rate) / 100), 1e-3))
+            model.factors.update({(voice, rate): float(np.median(r))
+                                  for rate, r in ratios.items() if len(r) >= 3})
+        return model
+
+    def _base(self, text: str, voice: str) -> float:
+        if voice in self.coefs:
+            return max(float(np.dot(self.coefs[voice], _features(text))), 0.1)
+        return len(text.split()) / PRIOR_WPS
+
+    def predict(self, text: str, voice: str, rate: str) -> float:
+        """Seconds of audio for a chunk at a rate like "-5%"."""
+        if (text, voice, rate) in self.known:
+            return self.known[(text, voice, rate)]
+        factor = self.factors.get((voice, rate), 1.0)
+        return self._base(text, voice) / (1 + rate_percent(rate) / 100) * factor
+
+
+def allocate_pauses(chunks: list, speech_s: float, target_dur: float) -> float:
+    """
+    Scale the pauses of a section so speech plus pauses lasts ``target_dur``.
+
+    The scripted length of each pause is kept in ``chunk["script_ms"]``, and
+    ``chunk["duration_ms"]`` is set within PAUSE_SCALE of it. Returns the
+    resulting section length in seconds.
+    """
+    pauses = [c for c in chunks if c["type"] == "pause"]
+    for pause in pauses:
+        pause.setdefault("script_ms", pause["duration_ms"])
+    scripted = sum(p["script_ms"] for p in pauses) / 1000.0
+    scale = 1.0
+    if scripted > 0 and target_dur > 0:
+        scale = min(max((target_dur - speech_s) / scripted, PAUSE_SCALE[0]), PAUSE_SCALE[1])
+    for pause in pauses:
+        pause["duration_ms"] = round(pause["script_ms"] * scale)
+    return speech_s + sum(p["duration_ms"] for p in pauses) / 1000.0
+
+
+def plan_section(chunks: list, target_dur: float, voice: str, model: DurationModel,
+                 rate: str = None) -> float:
+    """
+    Choose a rate per text chunk and the pause lengths for a section.
+
+    Chunks whose text is cached keep the rate of their latest take, so their
+    cache keys do not depend on the rest of the section; new or edited
+    chunks get the rate closest to the cached ones that lets the pauses fit
+    the section within PAUSE_SCALE. If that leaves the section more than
+    REPLAN_TOLERANCE off target (or nothing is cached), every chunk is
+    planned afresh: all start from the single integer rate in RATE_RANGE
+    that comes closest to ``target_dur``, then move individually (longest
+    first) one percent towards the target while that reduces the error, and
+    pauses absorb what is left. A fixed ``rate`` only leaves the pauses to
+    fit. Sets ``chunk["rate"]`` on text chunks and returns the predicted
+    duration.
+    """
+    texts = [c for c in chunks if c["type"] == "text"]
+    scripted = sum(c.get("script_ms", c["duration_ms"]) for c in chunks
+                   if c["type"] == "pause") / 1000.0
+
+    def speech(percents):
+        return sum(model.predict(c["content"], voice, rate_string(p))
+                   for c, p in zip(texts, percents))
+
+    lo, hi = RATE_RANGE
+
+    def residual(percents):
+        """Seconds off target once the pauses have been scaled."""
+        spoken = speech(percents)
+        scale = 1.0
+        if scripted > 0:
+            scale = min(max((target_dur - spoken) / scripted, PAUSE_SCALE[0]), PAUSE_SCALE[1])
+        return abs(spoken + scripted * scale - target_dur)
+
+    def choose(pinned):
+        free = [i for i in range(len(texts)) if i not in pinned]
+
+        def with_free(p):
+            return [pinned.get(i, p) for i in range(len(texts))]
+
+        if not free:
+            return with_free(None)
+        if pinned:
+            # Stay near the cached takes and let the pauses fit the section
+            anchor = int(np.median(list(pinned.values())))
+            return with_free(min(range(lo, hi + 1), key=lambda p: (
+                round(residual(with_free(p)), 2), abs(p - anchor))))
+        best = min(range(lo, hi + 1),
+                   key=lambda p: abs(speech(with_free(p)) + scripted - target_dur))
+        percents = with_free(best)
+        error = speech(percents) + scripted - target_dur
+        # Positive error: too long, so speed chunks up (and vice versa)
+        step = 1 if error > 0 else -1
+        for i in sorted(free, key=lambda i: -len(texts[i]["content"])):
+            if not lo <= percents[i] + step <= hi:
+                continue
+            trial = percents[:i] + [percents[i] + step] + percents[i + 1:]
+            trial_error = speech(trial) + scripted - target_dur
+            if abs(trial_error) >= abs(error):
+                break
+            percents, error = trial, trial_error
+        return percents
+
+    if rate is not None or not texts or target_dur <= 0:
+        percents = [rate_percent(rate or "+0%")] * len(texts)
+    else:
+        pinned = {}
+        for i, chunk in enumerate(texts):
+            cached = model.rates.get((chunk["content"], voice))
+            if cached is not None and lo <= rate_percent(cached) <= hi:
+                pinned[i] = rate_percent(cached)
+        percents = choose(pinned)
+        if pinned and residual(percents) > REPLAN_TOLERANCE:
+            percents = choose({})
+
+    for chunk, percent in zip(texts, percents):
+        chunk["rate"] = rate_string(percent)
+    return allocate_pauses(chunks, speech(percents), target_dur)
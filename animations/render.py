@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Parallel, cached Manim renders for the chapter videos.
+
+Discovers the Scene classes of a chapter (every public class in
+animations/chN/*.py that derives from ``Scene``) and renders them with
+``manim --disable_caching --media_dir media/chN``, one worker process per
+scene, up to ``--jobs`` at a time.
+
+A scene is skipped when its key is unchanged: the hash of its source file
+(which carries the design tokens), any sibling module it imports, the scene
+name, the quality and the Manim version, and its clip is still the one
+recorded. The manifest media/chN/renders.json records for each scene
+
+    {"key": ..., "output": "media/ch2/videos/em_algorithm/1080p60/EMAlgorithm.mp4",
+     "stamp": [size, mtime_ns], "duration": 58.2}
+
+so the narration and stitching steps read clip durations from it instead
+of SECTION_DEFS comments or ffprobe (see ``scene_durations`` and
+``clip_durations``).
+
+Scenes built with ``play_sections`` (animations/sections.py) are cached per
+section: a section's key covers its ``play_*`` method plus the rest of the
+file, so editing ``EMAlgorithm.play_m_step`` re-renders only that section.
+Section clips are kept in media/chN/sections/<Scene>/<quality>/ and spliced
+into the scene clip with a stream copy.
+
+Title cards listed in a chapter's section_titles.py ``CARDS`` are built
+from cached stills by animations/title_cards.py and recorded in the same
+manifest.
+
+Usage:
+    python animations/render.py ch2
+    python animations/render.py ch2 EMAlgorithm CATSimulation --force
+    python animations/render.py ch1 --jobs 4 --dry-run
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from sections import RENDER_SECTIONS_ENV
+from title_cards import build_card, card_key, chapter_cards
+
+# Configuration
+ROOT = Path(__file__).resolve().parent.parent
+ANIMATIONS_DIR = ROOT / "animations"
+JOBS = os.cpu_count() or 4
+QUALITY_DIRS = {"l": "480p15", "m": "720p30", "h": "1080p60", "k": "2160p60"}
+NON_SCENE_FILES = {"generate_narration.py", "stitch_narrated.py"}
+TITLES_FILE = "section_titles.py"
+
+
+def media_dir(chapter: str) -> Path:
+    return ROOT / "media" / chapter
+
+
+def manifest_path(chapter: str, quality: str = "h") -> Path:
+    suffix = "" if quality == "h" else f"_{QUALITY_DIRS[quality]}"
+    return media_dir(chapter) / f"renders{suffix}.json"
+
+
+def clip_path(chapter: str, source: Path, scene: str, quality: str = "h") -> Path:
+    """Where ``manim --media_dir media/chN`` writes a scene's clip."""
+    return media_dir(chapter) / "videos" / source.stem / QUALITY_DIRS[quality] / f"{scene}.mp4"
+
+
+def discover_scenes(chapter: str) -> dict:
+    """Public Scene subclasses of a chapter, mapped to their source files."""
+    scenes = {}
+    for source in sorted((ANIMATIONS_DIR / chapter).glob("*.py")):
+        if source.name in NON_SCENE_FILES:
+            continue
+        tree = ast.parse(source.read_text())
+        scene_classes = {"Scene", "MovingCameraScene", "ThreeDScene"}
+        for node in tree.body:  # classes are defined before their subclasses
+            if not isinstance(node, ast.ClassDef):
+                continue
+            bases = {b.id for b in node.bases if isinstance(b, ast.Name)}
+            if bases & scene_classes:
+                scene_classes.add(node.name)
+                if not node.name.startswith("_"):
+                    scenes[node.name] = source
+    return scenes
+
+
+def scene_sections(source: Path, scene: str) -> list:
+    """Names passed to ``play_sections`` in a scene's ``construct`` (if any)."""
+    for node in ast.parse(source.read_text()).body:
+        if not (isinstance(node, ast.ClassDef) and node.name == scene):
+            continue
+        for call in ast.walk(node):
+            if (isinstance(call, ast.Call) and isinstance(call.func, ast.Name)
+                    and call.func.id == "play_sections"):
+                return [arg.value for arg in call.args[1:] if isinstance(arg, ast.Constant)]
+    return []
+
+
+def section_keys(source: Path, scene: str, sections: list, quality: str, version: str) -> dict:
+    """
+    Key of each section: its method's source plus everything else in the
+    file (with the scene's section methods taken out) and local imports,
+    chained on the previous section's key. A section starts from the state
+    the earlier ones left behind, so changing one re-renders those after it.
+    """
+    tree = ast.parse(source.read_text())
+    methods = {}
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == scene:
+            methods = {n.name: ast.unparse(n) for n in node.body
+                       if isinstance(n, ast.FunctionDef) and n.name in sections}
+            node.body = [n for n in node.body
+                         if not (isinstance(n, ast.FunctionDef) and n.name in sections)]
+    common = hashlib.sha256(json.dumps([scene, quality, version, ast.unparse(tree)]).encode())
+    for path in local_imports(source):
+        common.update(b"\0" + path.read_bytes())
+    keys, previous = {}, common.digest()
+    for name in sections:
+        previous = hashlib.sha256(previous + methods.get(name, name).encode()).digest()
+        keys[name] = previous.hex()
+    return keys
+
+
+def local_imports(source: Path) -> list:
+    """Sibling modules (in the chapter or animations/) a scene file imports."""
+    names = set()
+    for node in ast.walk(ast.parse(source.read_text())):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    found = []
+    for name in sorted(names):
+        for directory in (source.parent, ANIMATIONS_DIR):
+            if (directory / f"{name}.py").is_file():
+                found.append(directory / f"{name}.py")
+                break
+    return found
+
+
+def manim_version() -> str:
+    try:
+        from importlib.metadata import version
+        return version("manim")
+    except Exception:
+        return "unknown"
+
+
+def scene_key(source: Path, scene: str, quality: str, version: str) -> str:
+    h = hashlib.sha256(json.dumps([scene, quality, version]).encode())
+    for path in [source] + local_imports(source):
+        h.update(b"\0" + str(path.relative_to(ROOT)).encode() + b"\0" + path.read_bytes())
+    return h.hexdigest()
+
+
+def _stamp(path: Path) -> list:
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def probe_duration(path) -> float:
+    result = subprocess.run(
+        ["ffprobe", "-v", "quiet", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", str(path)],
+        capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip())
+
+
+def render_command(chapter: str, source: Path, scene: str, quality: str) -> list:
+    return [sys.executable, "-m", "manim", f"-q{quality}", "--disable_caching",
+            "--media_dir", str(media_dir(chapter).relative_to(ROOT)),
+            str(source.relative_to(ROOT)), scene]
+
+
+def render_scene(chapter: str, source: Path, scene: str, quality: str):
+    """Render one scene in its own process. Returns (returncode, seconds, log tail)."""
+    start = time.perf_counter()
+    result = subprocess.run(render_command(chapter, source, scene, quality), cwd=ROOT,
+                            capture_output=True, text=True)
+    log = (result.stdout + result.stderr).strip().splitlines()[-15:]
+    return result.returncode, time.perf_counter() - start, log
+
+
+def section_cache(chapter: str, scene: str, quality: str) -> Path:
+    return media_dir(chapter) / "sections" / scene / QUALITY_DIRS[quality]
+
+
+def splice(clips, output: Path):
+    """Join section clips (same encoder settings) without re-encoding."""
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.writelines(f"file '{clip}'\n" for clip in clips)
+        concat_list = f.name
+    try:
+        subprocess.run(["ffmpeg", "-y", "-v", "error", "-f", "concat", "-safe", "0",
+                        "-i", concat_list, "-c", "copy", str(output)], check=True)
+    finally:
+        os.unlink(concat_list)
+
+
+def render_sections(chapter: str, source: Path, scene: str, quality: str, keys: dict):
+    """
+    Render only the stale sections of a scene, then splice all cached
+    section clips into the scene clip. Returns (returncode, seconds, log tail).
+    """
+    start = time.perf_counter()
+    cache = section_cache(chapter, scene, quality)
+    cache.mkdir(parents=True, exist_ok=True)
+    clips = {name: cache / f"{name}-{key[:16]}.mp4" for name, key in keys.items()}
+    stale = [name for name, clip in clips.items() if not clip.exists()]
+
+    log = [f"sections: {len(keys) - len(stale)} cached, re-rendering {', '.join(stale) or 'none'}"]
+    if stale:
+        # Partial renders go to a scratch media dir so the scene clip is not clobbered
+        with tempfile.TemporaryDirectory(dir=media_dir(chapter)) as scratch:
+            cmd = render_command(chapter, source, scene, quality)
+            cmd[cmd.index("--media_dir") + 1] = scratch
+            cmd.insert(-2, "--save_sections")
+            result = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True,
+                                    env={**os.environ, RENDER_SECTIONS_ENV: ",".join(stale)})
+            log += (result.stdout + result.stderr).strip().splitlines()[-15:]
+            if result.returncode != 0:
+                return result.returncode, time.perf_counter() - start, log
+            out_dir = Path(scratch) / "videos" / source.stem / QUALITY_DIRS[quality] / "sections"
+            for entry in json.loads((out_dir / f"{scene}.json").read_text()):
+                if entry["name"] in stale:
+                    shutil.move(str(out_dir / entry["video"]), clips[entry["name"]])
+        for name in stale:
+            for old in cache.glob(f"{name}-*.mp4"):
+                if old != clips[name]:
+                    old.unlink()
+
+    missing = [name for name, clip in clips.items() if not clip.exists()]
+    if missing:  # a section that renders no animation yields no clip
+        clips = {name: clip for name, clip in clips.items() if clip.exists()}
+        log.append(f"no clip for section(s) {', '.join(missing)}")
+    splice(list(clips.values()), clip_path(chapter, source, scene, quality))
+    return 0, time.perf_counter() - start, log
+
+
+def load_manifest(chapter: str, quality: str = "h") -> dict:
+    path = manifest_path(chapter, quality)
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def render_chapter(chapter, only=None, quality="h", jobs=JOBS, force=False, dry_run=False):
+    """
+    Render the stale scenes of a chapter in parallel.
+
+    Returns a list of (scene, status, seconds) rows.
+    """
+    scenes = discover_scenes(chapter)
+    titles = ANIMATIONS_DIR / chapter / TITLES_FILE
+    cards = chapter_cards(titles) if titles.exists() else {}
+    unknown = set(only or ()) - set(scenes) - set(cards)
+    if unknown:
+        raise SystemExit(f"{chapter}: unknown scene(s) {', '.join(sorted(unknown))}")
+    manifest = load_manifest(chapter, quality)
+    version = manim_version()
+
+    rows, todo = [], []
+    entries = [(scene, source, None) for scene, source in scenes.items()]
+    entries += [(scene, titles, card) for scene, card in cards.items()]
+    for scene, source, card in entries:
+        if only and scene not in only:
+            continue
+        sections = scene_sections(source, scene) if card is None else []
+        keys = section_keys(source, scene, sections, quality, version) if sections else None
+        if card is not None:
+            key = card_key(card, quality, version)
+        elif keys:
+            key = hashlib.sha256("".join(keys.values()).encode()).hexdigest()
+        else:
+            key = scene_key(source, scene, quality, version)
+        output = clip_path(chapter, source, scene, quality)
+        record = manifest.get(scene, {})
+        if (not force and record.get("key") == key and output.exists()
+                and record.get("stamp") == _stamp(output)):
+            rows.append((scene, "cached", 0.0))
+        elif dry_run:
+            rows.append((scene, "would run", 0.0))
+        else:
+            todo.append((scene, source, card, key, keys, output))
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {}
+        for scene, source, card, key, keys, output in todo:
+            print(f"  start  {scene} ({'title card' if card is not None else source.name})")
+            if card is not None:
+                future = pool.submit(build_card, card, output, quality, QUALITY_DIRS[quality],
+                                     version, media_dir(chapter) / "title_cards")
+            elif keys:
+                if force:
+                    shutil.rmtree(section_cache(chapter, scene, quality), ignore_errors=True)
+                future = pool.submit(render_sections, chapter, source, scene, quality, keys)
+            else:
+                future = pool.submit(render_scene, chapter, source, scene, quality)
+            futures[future] = (scene, key, output)
+        for future, (scene, key, output) in futures.items():
+            code, seconds, log = future.result()
+            if code != 0 or not output.exists():
+                rows.append((scene, "FAILED", seconds))
+                print(f"  FAILED {scene} ({seconds:.1f}s)")
+                for line in log:
+                    print(f"    {line}")
+                continue
+            manifest[scene] = {"key": key, "output": str(output.relative_to(ROOT)),
+                               "stamp": _stamp(output), "duration": probe_duration(output)}
+            rows.append((scene, "rendered", seconds))
+            detail = f", {log[0]}" if log and log[0].startswith("sections:") else ""
+            print(f"  done   {scene} ({seconds:.1f}s, clip {manifest[scene]['duration']:.1f}s"
+                  f"{detail})")
+
+    if todo:
+        manifest_path(chapter, quality).parent.mkdir(parents=True, exist_ok=True)
+        manifest_path(chapter, quality).write_text(json.dumps(manifest, indent=1))
+    return rows
+
+
+def scene_durations(chapter: str, quality: str = "h") -> dict:
+    """Clip length in seconds of every rendered scene of a chapter."""
+    return {scene: record["duration"]
+            for scene, record in load_manifest(chapter, quality).items()}
+
+
+def clip_durations() -> dict:
+    """Clip length by absolute clip path, for every chapter and quality."""
+    durations = {}
+    for path in sorted((ROOT / "media").glob("*/renders*.json")):
+        for record in json.loads(path.read_text()).values():
+            clip = ROOT / record["output"]
+            if clip.exists() and _stamp(clip) == record["stamp"]:
+                durations[clip] = record["duration"]
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the Manim scenes of a chapter.")
+    parser.add_argument("chapter", help="Chapter directory under animations/, e.g. ch2")
+    parser.add_argument("scenes", nargs="*", help="Only these scenes (default: all)")
+    parser.add_argument("--quality", choices=sorted(QUALITY_DIRS), default="h")
+    parser.add_argument("--jobs", type=int, default=JOBS)
+    parser.add_argument("--force", action="store_true", help="Ignore the render manifest")
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would render")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = render_chapter(args.chapter, args.scenes, args.quality, args.jobs,
+                          args.force, args.dry_run)
+    wall = time.perf_counter() - start
+
+    width = max([len(scene) for scene, _, _ in rows] + [5])
+    print(f"\n  {'scene':<{width}}  {'status':<9}  seconds")
+    for scene, status, seconds in rows:
+        print(f"  {scene:<{width}}  {status:<9}  {seconds:7.1f}")
+    busy = sum(seconds for _, _, seconds in rows)
+    print(f"\n  wall {wall:.1f}s, render time {busy:.1f}s")
+    if any(status == "FAILED" for _, status, _ in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Named Manim sections for the long chapter scenes.
+
+A scene that builds itself from ``play_*`` methods lists them once:
+
+    def construct(self):
+        self.camera.background_color = BG
+        play_sections(self, "play_title", "play_e_step", "play_m_step")
+
+Each method becomes a Manim section of the same name. animations/render.py
+renders only the sections whose method changed (it names them in
+AIMS_RENDER_SECTIONS and passes ``--save_sections``), caches every section
+clip, and splices the cached clips into the scene's clip. The other
+sections still run with ``skip_animations``, which builds their mobjects
+without rendering frames, so the scene state entering a re-rendered
+section is the same as in a full render.
+
+Without AIMS_RENDER_SECTIONS (e.g. a plain ``manim`` call) every section
+is rendered.
+"""
+
+import os
+
+RENDER_SECTIONS_ENV = "AIMS_RENDER_SECTIONS"
+
+
+def play_sections(scene, *names):
+    """Run ``scene.<name>()`` for each name, each in its own Manim section."""
+    only = os.environ.get(RENDER_SECTIONS_ENV)
+    only = set(only.split(",")) if only else None
+    for name in names:
+        scene.next_section(name, skip_animations=only is not None and name not in only)
+        getattr(scene, name)()
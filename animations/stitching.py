@@ -0,0 +1,284 @@
+"""
+Shared segment encoder for the narrated chapter videos.
+
+animations/chN/stitch_narrated.py lists the chapter's sections as
+(section_id, title card, animation, narration audio); this module turns
+each section into one segment and joins them:
+
+    title + animation ──concat──> tpad (freeze last frame) ──┐
+    narration audio ─────────────────────────────────────────┴─> segment.mp4
+
+Every segment is a single filter graph encoded once (libx264 + AAC), the
+segments are encoded in parallel, and the final video is a stream copy of
+the segments (plus an optional music mix that only re-encodes the audio).
+
+``--draft`` builds a proxy cut instead: 480p15 clips (``render.py
+--quality l``), draft narration (narration/draft/, see generate_narration.py
+--draft) or silent placeholders, and an ultrafast encode. Every input falls
+back to the other quality when its preferred version is missing (scaled to
+the profile's frame size), so full-quality clips replace proxies section by
+section as they are rendered; ``--allow-proxies`` does the same for a final
+cut with some scenes still at draft quality.
+
+Clip lengths come from the render manifests of animations/render.py when
+the clips are unchanged since they were rendered. Encoded segments are
+cached in animations/.segment_cache, keyed by the content hashes of their
+inputs and the encoder settings, so after editing the narration of one
+section only that segment is re-encoded.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from render import clip_durations
+
+# Configuration
+ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIR = Path(os.environ.get("AIMS_SEGMENT_CACHE", Path(__file__).parent / ".segment_cache"))
+JOBS = max(1, (os.cpu_count() or 4) // 4)  # x264 is multi-threaded already
+PROFILES = {
+    "final": {"quality": "1080p60", "size": (1920, 1080), "fps": 60,
+              "video": ["-c:v", "libx264", "-preset", "medium", "-crf", "18"],
+              "audio": ["-c:a", "aac", "-b:a", "192k", "-ar", "48000", "-ac", "2"]},
+    "draft": {"quality": "480p15", "size": (854, 480), "fps": 15,
+              "video": ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "28"],
+              "audio": ["-c:a", "aac", "-b:a", "96k", "-ar", "48000", "-ac", "2"]},
+}
+MUSIC_VOLUME = 0.06  # Lower default for narrated video
+
+
+def video_args(profile: dict) -> list:
+    return profile["video"] + ["-pix_fmt", "yuv420p", "-r", str(profile["fps"])]
+
+
+def probe_duration(path) -> float:
+    result = subprocess.run(
+        ["ffprobe", "-v", "quiet", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", str(path)],
+        capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip())
+
+
+def file_sha(path, memo) -> str:
+    """SHA-256 of a file, memoized on (size, mtime)."""
+    stat = Path(path).stat()
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    entry = memo.get(str(path))
+    if entry and entry[:2] == stamp:
+        return entry[2]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    memo[str(path)] = stamp + [h.hexdigest()]
+    return h.hexdigest()
+
+
+def variant(path: Path, quality: str) -> Path:
+    """The same clip rendered at another quality (media/.../<quality>/<Scene>.mp4)."""
+    return path.parent.parent / quality / path.name
+
+
+def resolve_inputs(section, profile_name, allow_proxies=False):
+    """
+    Pick the files a segment is built from under a profile.
+
+    Returns the section with existing paths (audio may be None for a silent
+    placeholder) and a list of notes about fallbacks.
+    """
+    sec_id, title, anim, audio = section
+    preferred = PROFILES[profile_name]["quality"]
+    fallback = PROFILES["final" if profile_name == "draft" else "draft"]["quality"]
+    notes, resolved = [], []
+    for clip in (title, anim):
+        if clip is None:
+            resolved.append(None)
+            continue
+        candidates = [variant(clip, preferred)]
+        if profile_name == "draft" or allow_proxies:
+            candidates.append(variant(clip, fallback))
+        found = next((c for c in candidates if c.exists()), None)
+        if found is None:
+            raise SystemExit(f"Missing clip: {candidates[0]}")
+        if found != candidates[0]:
+            notes.append(f"{clip.stem} at {fallback}")
+        resolved.append(found)
+
+    if profile_name == "draft":
+        candidates = [audio, audio.parent / "draft" / audio.name]
+        audio = next((c for c in candidates if c.exists()), None)
+        if audio is None:
+            notes.append("silent placeholder")
+        elif audio != candidates[0]:
+            notes.append("draft narration")
+    elif not audio.exists():
+        raise SystemExit(f"Missing narration: {audio}")
+    return (sec_id, *resolved, audio), notes
+
+
+def segment_command(title, anim, audio, output, profile=PROFILES["final"], known=None) -> list:
+    """
+    One ffmpeg call for a segment: concat the clips, freeze the last frame
+    for as long as the narration runs past them, and mux the narration.
+    Without narration, a silent track as long as the clips is muxed.
+
+    ``known`` maps clip paths to durations recorded by animations/render.py;
+    other inputs are probed.
+    """
+    known = known or {}
+    videos = [v for v in (title, anim) if v is not None]
+    clips = sum(known[v] if v in known else probe_duration(v) for v in videos)
+    extra = max(0.0, probe_duration(audio) - clips) if audio is not None else 0.0
+
+    width, height = profile["size"]
+    normalize = (f"fps={profile['fps']},scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                 f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,format=yuv420p,setsar=1")
+    graph = [f"[{i}:v]{normalize}[v{i}]" for i in range(len(videos))]
+    joined = "".join(f"[v{i}]" for i in range(len(videos)))
+    graph.append(f"{joined}concat=n={len(videos)}:v=1:a=0,"
+                 f"tpad=stop_mode=clone:stop_duration={extra:.3f}[v]")
+
+    cmd = ["ffmpeg", "-y", "-v", "error"]
+    for path in videos:
+        cmd += ["-i", str(path)]
+    if audio is not None:
+        cmd += ["-i", str(audio)]
+    else:
+        cmd += ["-f", "lavfi", "-t", f"{clips:.3f}", "-i", "anullsrc=r=48000:cl=stereo"]
+    cmd += ["-filter_complex", ";".join(graph),
+            "-map", "[v]", "-map", f"{len(videos)}:a",
+            *video_args(profile), *profile["audio"], "-shortest", str(output)]
+    return cmd
+
+
+def segment_key(title, anim, audio, memo, profile=PROFILES["final"]) -> str:
+    h = hashlib.sha256(json.dumps(profile).encode())
+    for path in (title, anim, audio):
+        h.update(b"\0" + (file_sha(path, memo).encode() if path is not None else b"none"))
+    return h.hexdigest()
+
+
+def encode_segment(section, memo, known=None, force=False, profile=PROFILES["final"]):
+    """
+    Encode one section (or reuse its cached segment).
+
+    Returns (section_id, segment path, status, seconds).
+    """
+    sec_id, title, anim, audio = section
+    start = time.perf_counter()
+    output = CACHE_DIR / f"{segment_key(title, anim, audio, memo, profile)}.mp4"
+    if output.exists() and not force:
+        return sec_id, output, "cached", time.perf_counter() - start
+
+    tmp = output.with_suffix(".tmp.mp4")
+    subprocess.run(segment_command(title, anim, audio, tmp, profile, known), check=True)
+    os.replace(tmp, output)
+    return sec_id, output, "encoded", time.perf_counter() - start
+
+
+def concat_segments(segments, output):
+    """Join encoded segments without re-encoding."""
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.writelines(f"file '{seg}'\n" for seg in segments)
+        concat_list = f.name
+    try:
+        subprocess.run(["ffmpeg", "-y", "-v", "error", "-f", "concat", "-safe", "0",
+                        "-i", concat_list, "-c", "copy", str(output)], check=True)
+    finally:
+        os.unlink(concat_list)
+
+
+def add_music(video, music, volume, output, audio_args=PROFILES["final"]["audio"]):
+    """Mix background music under the narration (the video stream is copied)."""
+    duration = probe_duration(video)
+    mix = (f"[0:a]volume=1.0[voice];"
+           f"[1:a]volume={volume},afade=t=in:d=3,"
+           f"afade=t=out:st={max(0.0, duration - 4):.3f}:d=4,apad,"
+           f"atrim=0:{duration:.3f}[music];"
+           f"[voice][music]amix=inputs=2:duration=first[aout]")
+    subprocess.run(["ffmpeg", "-y", "-v", "error", "-i", str(video), "-i", str(music),
+                    "-filter_complex", mix, "-map", "0:v", "-map", "[aout]",
+                    "-c:v", "copy", *audio_args, str(output)], check=True)
+
+
+def stitch(sections, output, music=None, music_volume=MUSIC_VOLUME, jobs=JOBS, force=False,
+           profile_name="final"):
+    """
+    Build a narrated chapter video from ``sections``, a list of
+    (section_id, title_video, animation_video, narration_audio) with None
+    for a missing title card or animation, as resolved by ``resolve_inputs``.
+    """
+    profile = PROFILES[profile_name]
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    memo_path = CACHE_DIR / "file_hashes.json"
+    memo = json.loads(memo_path.read_text()) if memo_path.exists() else {}
+    known = clip_durations()
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = list(pool.map(lambda s: encode_segment(s, memo, known, force, profile),
+                                sections))
+    memo_path.write_text(json.dumps(memo))
+
+    segments = [path for _, path, _, _ in results]
+    if music:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            silent = Path(tmpdir) / "narrated.mp4"
+            concat_segments(segments, silent)
+            print(f"Adding background music (volume={music_volume})...")
+            add_music(silent, music, music_volume, output, profile["audio"])
+    else:
+        concat_segments(segments, output)
+    return results
+
+
+def main(sections, output):
+    """Command-line entry point shared by the chapter stitch scripts."""
+    parser = argparse.ArgumentParser(description="Build the narrated chapter video.")
+    parser.add_argument("--music", default=None, help="Background music file")
+    parser.add_argument("--music-volume", type=float, default=MUSIC_VOLUME)
+    parser.add_argument("--jobs", type=int, default=JOBS, help="Segments encoded in parallel")
+    parser.add_argument("--force", action="store_true", help="Re-encode cached segments")
+    parser.add_argument("--draft", action="store_true",
+                        help="Low-resolution proxy cut (480p15 clips, ultrafast encode)")
+    parser.add_argument("--allow-proxies", action="store_true",
+                        help="Final cut: use 480p15 clips for scenes not rendered at 1080p60")
+    args = parser.parse_args()
+
+    profile_name = "draft" if args.draft else "final"
+    if args.draft:
+        output = str(Path(output).with_name(Path(output).stem + "_draft.mp4"))
+    resolved = []
+    for sec_id, *paths in sections:
+        section = (sec_id, *(ROOT / p if p is not None else None for p in paths))
+        section, notes = resolve_inputs(section, profile_name, args.allow_proxies)
+        if notes:
+            print(f"  {sec_id}: {', '.join(notes)}")
+        resolved.append(section)
+
+    print(f"Building narrated chapter video ({profile_name})...")
+    start = time.perf_counter()
+    results = stitch(resolved, ROOT / output, args.music, args.music_volume,
+                     args.jobs, args.force, profile_name)
+
+    total = probe_duration(ROOT / output)
+    minutes, seconds = divmod(int(total), 60)
+    print()
+    print("════════════════════════════════════════════")
+    print(f"Done: {output} ({time.perf_counter() - start:.1f}s)")
+    print(f"Total duration: {total:.1f}s ({minutes}:{seconds:02d})")
+    print("════════════════════════════════════════════")
+    print()
+    print("Segment breakdown:")
+    print("──────────────────────────────────────────")
+    for sec_id, path, status, secs in results:
+        print(f"  {sec_id:<20} {probe_duration(path):6.1f}s  {status:<8} ({secs:.1f}s)")
+    print("──────────────────────────────────────────")
+    print(f"  {'Total':<20} {total:6.1f}s")
@@ -0,0 +1,69 @@
+"""
+AIMS title card template — the final frame of a chapter opening or part card.
+
+animations/title_cards.py renders this scene once per card with
+``manim -s`` (last frame only) and synthesizes the fades and holds in the
+encoder. The card comes from the AIMS_TITLE_CARD environment variable:
+
+    {"kind": "opening", "chapter": "Chapter 2", "title": "Learning",
+     "subtitle": "AI Measurement Science"}
+    {"kind": "part", "number": 1, "title": "The Estimation Problem",
+     "subtitle": "From models to parameters", "color": "#5B8DEE"}
+
+plus the chapter's design tokens, which title_cards.py adds from its
+section_titles.py:
+
+    "tokens": {"ACCENT": "#FFD966", "BG": "#0f0f0f", "TEXT2": "#aaaaaa",
+               "PAL": ["#5B8DEE", ...]}
+
+The layouts are the end states of the former animated ChapterOpening and
+PartNTitle scenes.
+"""
+
+import json
+import os
+
+from manim import *
+
+CARD_ENV = "AIMS_TITLE_CARD"
+
+
+class TitleCardStill(Scene):
+    def construct(self):
+        card = json.loads(os.environ[CARD_ENV])
+        self.tokens = card["tokens"]
+        self.camera.background_color = self.tokens["BG"]
+        if card["kind"] == "opening":
+            self.add(*self.opening(card))
+        else:
+            self.add(*self.part(card))
+
+    def opening(self, card):
+        accent, text2 = self.tokens["ACCENT"], self.tokens["TEXT2"]
+        ch = Text(card["chapter"], font_size=24, color=text2)
+        ch.shift(UP * 1.2)
+
+        title = Text(card["title"], font_size=52, color=WHITE, weight=BOLD)
+        title.next_to(ch, DOWN, buff=0.35)
+
+        line = Line(LEFT * 3, RIGHT * 3, color=accent, stroke_width=2)
+        line.next_to(title, DOWN, buff=0.35)
+
+        sub = Text(card["subtitle"], font_size=28, color=accent)
+        sub.next_to(line, DOWN, buff=0.35)
+        return ch, title, line, sub
+
+    def part(self, card):
+        accent, text2 = self.tokens["ACCENT"], self.tokens["TEXT2"]
+        part_lbl = Text(f"Part {card['number']}", font_size=22, color=text2)
+        part_lbl.shift(UP * 0.8)
+
+        title = Text(card["title"], font_size=44, color=card.get("color", WHITE), weight=BOLD)
+        title.next_to(part_lbl, DOWN, buff=0.3)
+
+        line = Line(LEFT * 2, RIGHT * 2, color=accent, stroke_width=1.5)
+        line.next_to(title, DOWN, buff=0.3)
+
+        sub = Text(card["subtitle"], font_size=22, color=text2)
+        sub.next_to(line, DOWN, buff=0.3)
+        return part_lbl, title, line, sub
@@ -0,0 +1,139 @@
+"""
+Still-frame title cards for the chapter videos.
+
+Chapter opening and part cards are static text with a fade, so instead of
+rendering each as a 1080p60 Manim scene, a chapter lists them as data in
+its section_titles.py:
+
+    CARDS = {
+        "ChapterOpening": {"kind": "opening", "chapter": "Chapter 2", ...},
+        "Part1Title": {"kind": "part", "number": 1, ..., "color": PAL[0]},
+    }
+
+Each card's final frame is rendered once from animations/title_card_template.py
+(``manim -s``, one frame) and cached as a PNG keyed by the card, the
+chapter's design tokens (ACCENT, BG, TEXT2, PAL in section_titles.py), the
+template and the quality. The clip is then made by ffmpeg from the still:
+fade in from BG, hold, fade out to BG and a short tail, with the same
+lengths as the former animated cards. The clips
+land where Manim would have written them, and animations/render.py builds
+them alongside the chapter's scenes.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Configuration
+ROOT = Path(__file__).resolve().parent.parent
+TEMPLATE = Path(__file__).parent / "title_card_template.py"
+CARD_ENV = "AIMS_TITLE_CARD"
+CARD_TIMING = {  # seconds: fade in, hold, fade out, tail
+    "opening": (1.0, 4.3, 0.8, 0.5),
+    "part": (0.8, 2.8, 0.7, 0.3),
+}
+DESIGN_TOKENS = ("ACCENT", "BG", "TEXT2", "PAL")
+
+
+def chapter_cards(source: Path) -> dict:
+    """
+    ``CARDS`` of a section_titles.py, evaluated without importing Manim.
+
+    Module-level literal constants (the design tokens) are available to
+    the expression, so cards can use ``PAL[0]`` and ``ACCENT``. Each card
+    carries the chapter's DESIGN_TOKENS under ``"tokens"``, so the template
+    draws with them and they are part of the card's cache key.
+    """
+    tree = ast.parse(source.read_text())
+    constants, cards = {}, None
+    for node in tree.body:
+        if not (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name)):
+            continue
+        name = node.targets[0].id
+        if name == "CARDS":
+            cards = node.value
+            continue
+        try:
+            constants[name] = ast.literal_eval(node.value)
+        except ValueError:
+            pass
+    if cards is None:
+        return {}
+    missing = [name for name in DESIGN_TOKENS if name not in constants]
+    if missing:
+        raise ValueError(f"{source}: CARDS need the design tokens {', '.join(missing)}")
+    tokens = {name: constants[name] for name in DESIGN_TOKENS}
+    code = compile(ast.Expression(cards), str(source), "eval")
+    return {scene: {**card, "tokens": tokens}
+            for scene, card in eval(code, {"__builtins__": {}}, constants).items()}
+
+
+def timing(card: dict) -> tuple:
+    return tuple(card.get("timing", CARD_TIMING[card["kind"]]))
+
+
+def still_key(card: dict, quality: str, version: str) -> str:
+    h = hashlib.sha256(json.dumps([card, quality, version], sort_keys=True).encode())
+    h.update(TEMPLATE.read_bytes())
+    return h.hexdigest()
+
+
+def card_key(card: dict, quality: str, version: str) -> str:
+    return hashlib.sha256((still_key(card, quality, version)
+                           + json.dumps(timing(card))).encode()).hexdigest()
+
+
+def render_still(card: dict, quality: str, version: str, cache_dir: Path) -> Path:
+    """Final frame of a card as a PNG (rendered once per key)."""
+    png = cache_dir / f"{still_key(card, quality, version)[:16]}.png"
+    if png.exists():
+        return png
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory() as scratch:
+        subprocess.run(
+            [sys.executable, "-m", "manim", "-s", f"-q{quality}", "--disable_caching",
+             "--media_dir", scratch, str(TEMPLATE), "TitleCardStill"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+            env={**os.environ, CARD_ENV: json.dumps(card)},
+        )
+        frame = next(Path(scratch).glob("images/**/*.png"))
+        shutil.move(str(frame), png)
+    return png
+
+
+def encode_card(png: Path, card: dict, output: Path, fps: int):
+    """Clip from a still: fades to and from the chapter's BG are done by the encoder."""
+    fade_in, hold, fade_out, tail = timing(card)
+    total = fade_in + hold + fade_out + tail
+    bg = "0x" + card["tokens"]["BG"].lstrip("#")
+    vf = (f"fade=t=in:st=0:d={fade_in:.3f}:color={bg},"
+          f"fade=t=out:st={fade_in + hold:.3f}:d={fade_out:.3f}:color={bg},format=yuv420p")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    subprocess.run(
+        ["ffmpeg", "-y", "-v", "error", "-loop", "1", "-framerate", str(fps), "-i", str(png),
+         "-t", f"{total:.3f}", "-vf", vf, "-c:v", "libx264", "-preset", "medium",
+         "-tune", "stillimage", "-crf", "18", "-r", str(fps), str(output)],
+        check=True,
+    )
+
+
+def build_card(card: dict, output: Path, quality: str, quality_dir: str, version: str,
+               cache_dir: Path):
+    """Render (or reuse) a card's still and encode its clip. Returns (code, seconds, log)."""
+    start = time.perf_counter()
+    fps = int(quality_dir.split("p")[1])
+    try:
+        png = render_still(card, quality, version, cache_dir)
+        encode_card(png, card, output, fps)
+    except subprocess.CalledProcessError as err:
+        log = ((err.stdout or "") + (err.stderr or "")).strip().splitlines()[-15:]
+        return err.returncode, time.perf_counter() - start, log
+    return 0, time.perf_counter() - start, []
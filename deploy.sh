@@ -14,16 +14,10 @@ cd /lfs/skampere2/0/sttruong/aims
 # Pull latest changes
 # git pull
 
-# Note: Each quarto render clears _book/, so we need to preserve outputs
-# between renders by syncing to a temporary location
-
-# Build PDF first (this populates _book/ with PDF)
-echo "Building PDF..."
-quarto render --to pdf --profile pdf
-
-# Build HTML (this adds HTML to _book/ without clearing PDF)
-echo "Building HTML..."
-quarto render --to html --profile html --no-clean
+# Build plates, snapshots, HTML chapters and the PDF in parallel; steps whose
+# inputs are unchanged since the last build are skipped (see _build/state.json)
+echo "Building book..."
+python scripts/build_book.py
 
 # Deploy book to www
 echo "Deploying to www..."
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Parallel, incremental build of the book.
+
+Instead of one sequential ``quarto render`` per format, the build is split
+into steps with explicit inputs and outputs:
+
+    data        precompute_data_subsets.py -> src/data/*_subset*.bin  (--data only)
+    tiles       build_tiles.py helm -> src/data/tiles/helm/*  (--data only)
+    plates      src/Figures/generate_plates.py -> src/Figures/plate_*.png
+    snapshots   snapshot_cells.py -> src/snapshots/**
+    html:<doc>  quarto render <doc> --to html, one step per chapter
+    pdf         quarto render --to pdf (the PDF is a single book document)
+
+Each chapter is scanned for the files it uses (includes, images, data and
+pyodide files, snapshots, front-matter scripts), which gives the dependency
+graph: a chapter waits for the steps that produce its inputs. Steps run in
+parallel as soon as their dependencies are done, up to ``--jobs`` at a time,
+except that the Quarto renders run one at a time: renders in one project
+share ``_book/``, ``search.json``, the sidebar and the ``.quarto/`` freeze
+and index state, which concurrent ``quarto render`` processes would corrupt.
+The PDF renders last and is copied into ``_book/``.
+
+A step is skipped when the content hash of its inputs (files plus command)
+matches the last successful run and its outputs are unchanged, so a no-op
+rebuild only hashes files, and editing one chapter re-renders only that
+chapter (and the PDF). Executed ``{python}`` chunks come back from
+scripts/chunk_cache.py. State is kept in ``_build/state.json``. Every run
+ends with a per-step timing breakdown.
+
+Usage:
+    python scripts/build_book.py
+    python scripts/build_book.py --to html --jobs 4
+    python scripts/build_book.py --dry-run
+    python scripts/build_book.py --force --data
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import yaml
+
+from snapshot_cells import SNAPSHOT_CELLS
+
+# Configuration
+ROOT = Path(__file__).resolve().parent.parent
+BOOK_DIR = ROOT / "_book"
+BUILD_DIR = ROOT / "_build"
+STATE_PATH = BUILD_DIR / "state.json"
+PROJECT_INPUTS = ["_quarto.yml", "references.bib", "resources/**/*", "_extensions/**/*"]
+JOBS = os.cpu_count() or 4
+
+INCLUDE = re.compile(r"\{\{<\s*include\s+(\S+)\s*>\}\}")
+IMAGE = re.compile(r"\]\(([^)\s]+)[^)]*\)")
+SCRIPT_SRC = re.compile(r"""src=["']([^"':]+)["']""")
+DATA_REF = re.compile(r"""["']((?:data|pyodide|Figures)/[^"'\s]+)["']""")
+
+
+class Step:
+    """One unit of the build: a command with input and output files."""
+
+    def __init__(self, name, cmd, inputs, outputs, deps=(), after=None, group=None):
+        self.name = name
+        self.cmd = cmd
+        self.inputs = inputs    # callable -> list of Paths, evaluated when the step is ready
+        self.outputs = outputs  # callable -> list of Paths, evaluated after the step ran
+        self.deps = set(deps)
+        self.after = after      # optional idempotent callable, run after the command or a cache hit
+        self.group = group      # steps of one group never run concurrently
+
+    def input_hash(self, hasher):
+        h = hashlib.sha256(json.dumps(self.cmd).encode())
+        for path in sorted(set(self.inputs())):
+            h.update(str(path.relative_to(ROOT)).encode() + b"\0")
+            h.update(hasher.sha(path).encode() if path.exists() else b"missing")
+        return h.hexdigest()
+
+
+class FileHasher:
+    """SHA-256 of files, memoized on (size, mtime) across runs."""
+
+    def __init__(self, memo):
+        self.memo = memo
+
+    def sha(self, path):
+        stat = path.stat()
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        entry = self.memo.get(str(path))
+        if entry and entry[:2] == stamp:
+            return entry[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        self.memo[str(path)] = stamp + [h.hexdigest()]
+        return h.hexdigest()
+
+
+def expand(patterns, base=ROOT):
+    """Files matching glob patterns (relative to ``base``)."""
+    return sorted(p for pattern in patterns for p in base.glob(pattern) if p.is_file())
+
+
+def scan_document(path):
+    """
+    Local files a .qmd document uses: includes (recursively), images,
+    front-matter script sources and data / pyodide / figure paths in code.
+    """
+    text = path.read_text()
+    refs = set()
+    for pattern in (INCLUDE, IMAGE, SCRIPT_SRC, DATA_REF):
+        refs.update(pattern.findall(text))
+    files = {path}
+    for ref in refs:
+        if "://" in ref or ref.startswith("#"):
+            continue
+        target = (path.parent / ref).resolve()
+        if target.is_file():
+            files |= scan_document(target) if target.suffix == ".qmd" else {target}
+        elif target.is_dir():
+            files.update(p for p in target.rglob("*") if p.is_file())
+    chapter = path.stem
+    if chapter in SNAPSHOT_CELLS:
+        files.update(expand([f"src/snapshots/{chapter}/*"]))
+    return files
+
+
+def plate_outputs():
+    script = ROOT / "src" / "Figures" / "generate_plates.py"
+    names = sorted(set(re.findall(r"\"(plate_\w+\.png)\"", script.read_text())))
+    return [script.parent / name for name in names]
+
+
+def build_graph(formats, with_data=False):
+    """Steps of the build keyed by name."""
+    config = yaml.safe_load((ROOT / "_quarto.yml").read_text())
+    documents = [ROOT / doc for doc in config["book"]["chapters"]]
+    project = lambda: expand(PROJECT_INPUTS)
+
+    steps = {}
+    if with_data:
+        steps["data"] = Step(
+            "data", [sys.executable, "scripts/precompute_data_subsets.py"],
+            inputs=lambda: expand(["scripts/precompute_data_subsets.py",
+                                   "scripts/response_codec.py", "scripts/response_store.py"]),
+            outputs=lambda: expand(["src/data/*_subset*.bin"]))
+        # Reads the response store the data step converts on first use
+        steps["tiles"] = Step(
+            "tiles", [sys.executable, "scripts/build_tiles.py", "helm"],
+            inputs=lambda: expand(["scripts/build_tiles.py", "scripts/response_store.py"]),
+            outputs=lambda: expand(["src/data/tiles/helm/*"]), deps={"data"})
+    steps["plates"] = Step(
+        "plates", [sys.executable, "src/Figures/generate_plates.py"],
+        inputs=lambda: [ROOT / "src" / "Figures" / "generate_plates.py"],
+        outputs=plate_outputs)
+    steps["snapshots"] = Step(
+        "snapshots", [sys.executable, "scripts/snapshot_cells.py"],
+        inputs=lambda: expand(["scripts/snapshot_cells.py", "src/_plt_setup.qmd"]
+                              + [f"src/{chapter}.qmd" for chapter in SNAPSHOT_CELLS]),
+        outputs=lambda: expand(["src/snapshots/**/*"]))
+
+    # Which step produces a given file (evaluated on the current tree)
+    def producers(files):
+        produced = {}
+        for step in steps.values():
+            if step.group == "quarto":
+                continue
+            for out in step.outputs():
+                produced[out.resolve()] = step.name
+        return {produced[f] for f in files if f in produced}
+
+    renders = []
+    if "html" in formats:
+        for doc in documents:
+            rel = doc.relative_to(ROOT)
+            html = BOOK_DIR / rel.with_suffix(".html")
+            scan = lambda doc=doc: sorted(scan_document(doc)) + project()
+            steps[f"html:{rel}"] = Step(
+                f"html:{rel}", ["quarto", "render", str(rel), "--to", "html"],
+                inputs=scan, outputs=lambda html=html: [html],
+                deps=producers(scan_document(doc)) & set(steps), group="quarto")
+            renders.append(f"html:{rel}")
+    if "pdf" in formats:
+        all_docs = lambda: sorted(set().union(*(scan_document(d) for d in documents))) + project()
+        pdf_dir = BUILD_DIR / "pdf"
+
+        def copy_pdf():
+            for pdf in pdf_dir.glob("*.pdf"):
+                BOOK_DIR.mkdir(exist_ok=True)
+                shutil.copy2(pdf, BOOK_DIR / pdf.name)
+
+        # Last, so the copy into _book/ follows any HTML render of this run
+        steps["pdf"] = Step(
+            "pdf", ["quarto", "render", "--to", "pdf", "--output-dir", str(pdf_dir.relative_to(ROOT))],
+            inputs=all_docs, outputs=lambda: expand(["*.pdf"], pdf_dir),
+            deps=(producers(set(all_docs())) | set(renders)) & set(steps), after=copy_pdf,
+            group="quarto")
+    return steps
+
+
+def run_step(step):
+    """Run a step's command. Returns (returncode, seconds, tail of the log)."""
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(step.cmd, cwd=ROOT, capture_output=True, text=True,
+                                env={**os.environ, "PYTHONPATH": str(ROOT / "scripts")})
+    except OSError as err:  # e.g. quarto not on PATH
+        return 127, time.perf_counter() - start, [str(err)]
+    if result.returncode == 0 and step.after is not None:
+        step.after()
+    log = (result.stdout + result.stderr).strip().splitlines()[-15:]
+    return result.returncode, time.perf_counter() - start, log
+
+
+def build(steps, jobs=JOBS, force=False, dry_run=False):
+    """
+    Execute the graph. Returns a list of (name, status, seconds) rows.
+    """
+    state = json.loads(STATE_PATH.read_text()) if STATE_PATH.exists() else {}
+    hasher = FileHasher(state.setdefault("_files", {}))
+    done, failed, rows = set(), set(), []
+    running = {}  # future -> (step, input hash)
+
+    def outputs_intact(step, record):
+        outs = record.get("outputs", {})
+        return bool(outs) and all((ROOT / p).exists() and hasher.sha(ROOT / p) == h
+                                  for p, h in outs.items())
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while len(done) + len(failed) < len(steps):
+            busy = {step.name for step, _ in running.values()}
+            groups = {step.group for step, _ in running.values() if step.group}
+            ready = [s for s in steps.values()
+                     if s.name not in done | failed | busy and s.deps <= done | failed]
+            for step in ready:
+                if step.deps & failed:
+                    failed.add(step.name)
+                    rows.append((step.name, "blocked", 0.0))
+                    continue
+                if step.group in groups:
+                    continue
+                start = time.perf_counter()
+                key = step.input_hash(hasher)
+                record = state.get(step.name, {})
+                if not force and record.get("inputs") == key and outputs_intact(step, record):
+                    if step.after is not None and not dry_run:
+                        step.after()
+                    done.add(step.name)
+                    rows.append((step.name, "cached", time.perf_counter() - start))
+                elif dry_run:
+                    done.add(step.name)
+                    rows.append((step.name, "would run", 0.0))
+                else:
+                    print(f"  start  {step.name}")
+                    running[pool.submit(run_step, step)] = (step, key)
+                    if step.group:
+                        groups.add(step.group)
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step, key = running.pop(future)
+                code, seconds, log = future.result()
+                if code != 0:
+                    failed.add(step.name)
+                    rows.append((step.name, "FAILED", seconds))
+                    print(f"  FAILED {step.name} ({seconds:.1f}s)")
+                    for line in log:
+                        print(f"    {line}")
+                    continue
+                done.add(step.name)
+                rows.append((step.name, "built", seconds))
+                print(f"  done   {step.name} ({seconds:.1f}s)")
+                state[step.name] = {
+                    "inputs": key,
+                    "outputs": {str(p.relative_to(ROOT)): hasher.sha(p) for p in step.outputs()},
+                    "seconds": round(seconds, 2),
+                }
+            if not dry_run:
+                BUILD_DIR.mkdir(exist_ok=True)
+                STATE_PATH.write_text(json.dumps(state, indent=1))
+    if not dry_run:
+        BUILD_DIR.mkdir(exist_ok=True)
+        STATE_PATH.write_text(json.dumps(state, indent=1))
+    return rows
+
+
+def print_timings(rows, wall):
+    width = max(len(name) for name, _, _ in rows)
+    print(f"\n  {'step':<{width}}  {'status':<9}  seconds")
+    for name, status, seconds in rows:
+        print(f"  {name:<{width}}  {status:<9}  {seconds:7.2f}")
+    busy = sum(seconds for _, status, seconds in rows if status in ("built", "FAILED"))
+    print(f"\n  wall {wall:.1f}s, step time {busy:.1f}s"
+          + (f" ({busy / wall:.1f}x parallel)" if wall > 0 and busy > wall else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel incremental book build.")
+    parser.add_argument("--to", choices=["html", "pdf", "all"], default="all")
+    parser.add_argument("--jobs", type=int, default=JOBS)
+    parser.add_argument("--force", action="store_true", help="Ignore cached step state")
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would run")
+    parser.add_argument("--data", action="store_true",
+                        help="Also regenerate data subsets and tiles (needs the HuggingFace cache)")
+    args = parser.parse_args()
+
+    formats = ["html", "pdf"] if args.to == "all" else [args.to]
+    start = time.perf_counter()
+    steps = build_graph(formats, with_data=args.data)
+    rows = build(steps, args.jobs, args.force, args.dry_run)
+    print_timings(rows, time.perf_counter() - start)
+    if any(status in ("FAILED", "blocked") for _, status, _ in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
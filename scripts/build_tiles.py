@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Export a response matrix as row-block tiles for lazy loading in pyodide.
+
+Interactive cells cannot download a full HELM or Open LLM matrix up front,
+so the matrix is cut into blocks of TILE_ROWS models. Each tile uses the
+bitplane payload of response_codec.py (plane 0 = correct, plane 1 = missing,
+packed together) and all tiles are concatenated into one file:
+
+    src/data/tiles/helm/
+        index.json      shape, tile rows, byte offset/length per tile, models
+        items.json      item IDs (fetched only when a cell asks for them)
+        tiles.bin       concatenated tile payloads (HTTP range requests)
+        tile_00000.bin  optional per-tile copies (--per-tile-files) for hosts
+        ...             that ignore Range headers
+
+The browser side is src/pyodide/tile_loader.py.
+
+Usage:
+    python scripts/build_tiles.py helm
+    python scripts/build_tiles.py openllm --tile-rows 32 --per-tile-files
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from response_store import ResponseStore
+
+# Configuration
+TILE_ROWS = 64
+OUTPUT_DIR = Path(__file__).parent.parent / "src" / "data" / "tiles"
+STORE_DIR = Path(os.environ.get("AIMS_STORE_DIR", Path.home() / ".cache/aims/response_stores"))
+
+
+def encode_tile(block):
+    """Pack a (r, M) block into the two-plane bit payload."""
+    missing = np.isnan(block)
+    planes = np.stack([np.nan_to_num(block) == 1, missing])
+    return np.packbits(planes).tobytes()
+
+
+def build_tiles(store, out_dir, tile_rows=TILE_ROWS, per_tile_files=False, cols=None):
+    """
+    Write the tiled layout for ``store`` (optionally restricted to ``cols``).
+
+    Returns the index dict.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    N = store.shape[0]
+    col_idx = np.arange(store.shape[1]) if cols is None else np.asarray(cols)
+    M = len(col_idx)
+
+    tiles = []
+    offset = 0
+    with open(out_dir / "tiles.bin", "wb") as f:
+        for rows, block in store.iter_row_blocks(tile_rows, cols=col_idx):
+            payload = encode_tile(block)
+            f.write(payload)
+            entry = {"row_start": rows.start, "n_rows": block.shape[0],
+                     "offset": offset, "length": len(payload)}
+            if per_tile_files:
+                entry["file"] = f"tile_{len(tiles):05d}.bin"
+                (out_dir / entry["file"]).write_bytes(payload)
+            tiles.append(entry)
+            offset += len(payload)
+
+    index = {
+        "version": 1,
+        "shape": [int(N), int(M)],
+        "tile_rows": tile_rows,
+        "data_file": "tiles.bin",
+        "items_file": "items.json",
+        "models": [str(m) for m in store.row_ids],
+        "tiles": tiles,
+    }
+    with open(out_dir / "index.json", "w") as f:
+        json.dump(index, f)
+    with open(out_dir / "items.json", "w") as f:
+        json.dump([str(c) for c in np.asarray(store.col_ids)[col_idx]], f)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export row-block tiles for pyodide.")
+    parser.add_argument("dataset", help="Store name without suffix, e.g. 'helm'")
+    parser.add_argument("--tile-rows", type=int, default=TILE_ROWS)
+    parser.add_argument("--max-items", type=int, default=None,
+                        help="Keep only the first N items (columns)")
+    parser.add_argument("--per-tile-files", action="store_true",
+                        help="Also write one file per tile for hosts without Range support")
+    args = parser.parse_args()
+
+    store = ResponseStore.open(STORE_DIR / f"{args.dataset}.responses")
+    cols = None if args.max_items is None else np.arange(min(args.max_items, store.shape[1]))
+    out_dir = OUTPUT_DIR / args.dataset
+    index = build_tiles(store, out_dir, args.tile_rows, args.per_tile_files, cols)
+
+    size = (out_dir / "tiles.bin").stat().st_size
+    print(f"  {args.dataset}: {index['shape'][0]} x {index['shape'][1]} -> "
+          f"{len(index['tiles'])} tiles, {size / 1e6:.1f} MB in {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Content-hash execution cache for Quarto ``{python}`` chunks.
+
+Quarto's own ``cache: true`` re-executes a whole chapter when any chunk
+changes. This IPython extension caches each chunk separately in a
+jupyter-cache store, so turning ``eval`` on for the heavy chunks of
+chapters 2 and 4 (JML_trainer, tetrachoric_matrix_torch, embedding
+pipelines) only costs compute for chunks that actually changed.
+
+Every chunk executed by the kernel gets a key
+
+    key_i = sha256(key_{i-1}, source_i, hashes of data files named in chunk i)
+
+so a chunk is re-run when its source, any upstream chunk, or an input file
+it reads changes. A hit replays the stored stdout, stderr, figures and
+results instead of running the code. The names the chunk bound or changed
+(in place too: values are compared by a content fingerprint, not identity)
+are pickled as a jupyter-cache artifact. They are unpickled only when a
+later chunk misses and needs to run, so a fully cached render executes
+nothing. Keys do
+not depend on the output format, so outputs cached by the HTML render are
+reused by the PDF render (and vice versa).
+
+A chapter opts in with a hidden setup chunk:
+
+    ```{python}
+    #| include: false
+    import sys
+    sys.path.insert(0, "../scripts")
+    %load_ext chunk_cache
+    ```
+
+Chunks containing ``#| chunk-cache: false``, magics-only chunks, chunks
+with top-level ``await`` and Quarto's own setup and cleanup cells are
+always executed, as are chunks whose new names cannot be pickled or
+restored in a fresh kernel: functions and classes defined in a chunk are
+pickled by reference to ``__main__``, so their chunk always runs, which in
+turn lets later chunks restore instances of them. Modules are restored by
+re-importing them. The state of earlier replayed chunks is restored before
+an always-run chunk, and its source is part of the key chain like any other
+chunk's (Quarto's cells excepted, so keys stay independent of the output
+format; its setup cell restarts the chain for a kernel reused across renders).
+
+Usage:
+    python scripts/chunk_cache.py info
+    python scripts/chunk_cache.py clear
+"""
+
+import argparse
+import ast
+import hashlib
+import importlib
+import json
+import os
+import pickle
+import re
+import shutil
+import sys
+import tempfile
+import types
+from pathlib import Path
+
+# Configuration
+CACHE_DIR = Path(os.environ.get("AIMS_CHUNK_CACHE", Path(__file__).parent.parent / "_chunk_cache"))
+CACHE_LIMIT = 5000  # jupyter-cache records kept before the oldest are evicted
+STATE_FILE = "state.pkl"
+KEY_SEED = "chunk-cache-v2"  # bump when what a record stores changes
+SKIP_MARKER = re.compile(r"^#\|\s*chunk-cache:\s*false\s*$", re.MULTILINE)
+CELL_OPTION = re.compile(r"^#\|", re.MULTILINE)
+# Lines of Quarto's injected python setup cell (resources/jupyter/lang/python)
+QUARTO_SETUP = re.compile(r"^(def ojs_define\(|kernel_deps = dict\(\))", re.MULTILINE)
+HIDDEN_NAMES = ("In", "Out", "exit", "quit", "get_ipython")
+
+_extension = None
+
+
+def _hash_file(path, h):
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+
+
+class DataHasher:
+    """
+    Content hashes of input files and directories, memoized on disk.
+
+    Hashes are reused while a file's size and mtime are unchanged, so large
+    response stores and item banks are only read once per modification.
+    """
+
+    def __init__(self, memo_path):
+        self.memo_path = Path(memo_path)
+        self.memo = json.loads(self.memo_path.read_text()) if self.memo_path.exists() else {}
+
+    def file_sha(self, path):
+        stat = path.stat()
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        entry = self.memo.get(str(path))
+        if entry and entry[:2] == stamp:
+            return entry[2]
+        h = hashlib.sha256()
+        _hash_file(path, h)
+        self.memo[str(path)] = stamp + [h.hexdigest()]
+        return h.hexdigest()
+
+    def sha(self, path):
+        """Hash of a file, or of every file under a directory."""
+        path = Path(path).resolve()
+        if path.is_file():
+            return self.file_sha(path)
+        h = hashlib.sha256()
+        for child in sorted(p for p in path.rglob("*") if p.is_file()):
+            h.update(str(child.relative_to(path)).encode() + b"\0")
+            h.update(self.file_sha(child).encode())
+        return h.hexdigest()
+
+    def save(self):
+        self.memo_path.parent.mkdir(parents=True, exist_ok=True)
+        self.memo_path.write_text(json.dumps(self.memo))
+
+
+def data_references(source):
+    """String literals in a chunk that name existing files or directories."""
+    try:
+        literals = [node.value for node in ast.walk(ast.parse(source))
+                    if isinstance(node, ast.Constant) and isinstance(node.value, str)]
+    except SyntaxError:  # magics or shell escapes
+        literals = re.findall(r"""["']([^"'\n]+)["']""", source)
+    return sorted({s for s in literals if len(s) < 256 and "\n" not in s and os.path.exists(s)})
+
+
+def chunk_key(previous, source, hasher):
+    """Chained content key of a chunk."""
+    h = hashlib.sha256(previous.encode() + b"\0" + source.encode())
+    for ref in data_references(source):
+        h.update(b"\0" + ref.encode() + b"\0" + hasher.sha(ref).encode())
+    return h.hexdigest()
+
+
+def quarto_cell(source):
+    """Quarto's own setup cell, which depends on the output format."""
+    return not CELL_OPTION.search(source) and bool(QUARTO_SETUP.search(source))
+
+
+def user_names(ns):
+    """Names in a user namespace that chunk state is made of."""
+    return [name for name in ns if not name.startswith("_") and name not in HIDDEN_NAMES]
+
+
+def fingerprint(value):
+    """
+    Content hash of a value, or its identity when it cannot be pickled.
+
+    Pickle protocol 5 hands array buffers out of band, so large numpy arrays
+    are hashed in place rather than copied into the pickle stream.
+    """
+    buffers = []
+    try:
+        h = hashlib.blake2b(pickle.dumps(value, protocol=5, buffer_callback=buffers.append),
+                            digest_size=16)
+        for buffer in buffers:
+            h.update(buffer.raw())
+    except Exception:
+        return id(value)
+    return h.hexdigest()
+
+
+def defined_here(value):
+    """Functions and classes of ``__main__``, which pickle by reference only."""
+    return (isinstance(value, (type, types.FunctionType))
+            and getattr(value, "__module__", None) == "__main__")
+
+
+def cacheable(source):
+    """Whether a chunk goes through the cache at all."""
+    code = [line for line in source.splitlines() if line.strip() and not line.startswith("#")]
+    if not code or SKIP_MARKER.search(source):
+        return False
+    if all(line.lstrip().startswith(("%", "!")) for line in code):
+        return False
+    return not quarto_cell(source) and "await " not in source
+
+
+def _chunk_notebook(key, source, outputs=()):
+    """One-cell notebook stored in jupyter-cache; the key line makes it unique."""
+    import nbformat
+
+    nb = nbformat.v4.new_notebook()
+    nb.metadata["kernelspec"] = {"name": "python3", "display_name": "Python 3", "language": "python"}
+    cell = nbformat.v4.new_code_cell(f"# chunk-key: {key}\n{source}")
+    cell.outputs = [nbformat.from_dict(o) for o in outputs]
+    nb.cells.append(cell)
+    return nb
+
+
+class _Recorder:
+    """Tee stdout/stderr, display data and execute results while a chunk runs."""
+
+    def __init__(self, shell):
+        self.shell = shell
+        self.outputs = []
+
+    def _stream(self, name, stream):
+        write = stream.write
+
+        def tee(text):
+            if self.outputs and self.outputs[-1].get("name") == name:
+                self.outputs[-1]["text"] += text
+            else:
+                self.outputs.append({"output_type": "stream", "name": name, "text": text})
+            return write(text)
+
+        return tee
+
+    def __enter__(self):
+        pub, hook = self.shell.display_pub, self.shell.displayhook
+        self._saved = [(pub, "publish", pub.publish),
+                       (hook, "write_format_data", hook.write_format_data),
+                       (sys.stdout, "write", sys.stdout.write),
+                       (sys.stderr, "write", sys.stderr.write)]
+        publish, write_format_data = pub.publish, hook.write_format_data
+
+        def record_display(data, metadata=None, *args, **kwargs):
+            self.outputs.append({"output_type": "display_data", "data": dict(data),
+                                 "metadata": dict(metadata or {})})
+            return publish(data, metadata, *args, **kwargs)
+
+        def record_result(format_dict, md_dict=None):
+            self.outputs.append({"output_type": "execute_result", "data": dict(format_dict),
+                                 "metadata": dict(md_dict or {}), "execution_count": None})
+            return write_format_data(format_dict, md_dict)
+
+        pub.publish = record_display
+        hook.write_format_data = record_result
+        for name in ("stdout", "stderr"):
+            stream = getattr(sys, name)
+            try:
+                stream.write = self._stream(name, stream)
+            except AttributeError:  # plain TextIOWrapper (not a kernel)
+                pass
+        return self
+
+    def __exit__(self, *exc):
+        for obj, name, original in self._saved:
+            try:
+                setattr(obj, name, original)
+            except AttributeError:
+                pass
+        return False
+
+
+class ChunkCache:
+    """Per-chunk cache wired into an IPython shell's ``run_cell``."""
+
+    def __init__(self, shell, cache_dir=CACHE_DIR):
+        from jupyter_cache import get_cache
+
+        self.shell = shell
+        self.cache = get_cache(cache_dir)
+        self.cache.change_cache_limit(CACHE_LIMIT)
+        self.hasher = DataHasher(Path(cache_dir) / "data_hashes.json")
+        self.previous = KEY_SEED
+        self.deferred = []  # cache records whose state is not yet in user_ns
+        self.hits = self.misses = 0
+        self._run_cell = shell.run_cell
+
+    def run_cell(self, raw_cell, *args, **kwargs):
+        if not cacheable(raw_cell):
+            if quarto_cell(raw_cell):
+                # A kernel kept alive across renders starts a new document
+                self.previous, self.deferred = KEY_SEED, []
+            else:
+                # An always-run chunk may read names bound by replayed chunks,
+                # and its code feeds the keys of the chunks after it
+                self._restore_deferred()
+                self.previous = chunk_key(self.previous, raw_cell, self.hasher)
+                self.hasher.save()
+            return self._run_cell(raw_cell, *args, **kwargs)
+
+        key = chunk_key(self.previous, raw_cell, self.hasher)
+        self.hasher.save()
+        self.previous = key
+        try:
+            record = self.cache.match_cache_notebook(_chunk_notebook(key, raw_cell))
+        except KeyError:
+            record = None
+        if record is not None and record.data.get("complete"):
+            self.hits += 1
+            self.deferred.append(record)
+            self._replay(self.cache.get_cache_bundle(record.pk).nb.cells[0].outputs)
+            return self._run_cell("pass", *args, **kwargs)
+
+        self.misses += 1
+        self._restore_deferred()
+        ns = self.shell.user_ns
+        before = {name: (id(ns[name]), fingerprint(ns[name])) for name in user_names(ns)}
+        with _Recorder(self.shell) as recorder:
+            result = self._run_cell(raw_cell, *args, **kwargs)
+        if result.success:
+            self._store(key, raw_cell, recorder.outputs, before)
+        return result
+
+    def _replay(self, outputs):
+        for out in outputs:
+            if out["output_type"] == "stream":
+                getattr(sys, out["name"]).write(out["text"])
+            elif out["output_type"] in ("display_data", "execute_result"):
+                self.shell.display_pub.publish(dict(out["data"]), dict(out.get("metadata", {})))
+
+    def _restore_deferred(self):
+        """Load the state of every replayed chunk before a chunk really runs."""
+        for record in self.deferred:
+            bundle = self.cache.get_cache_bundle(record.pk)
+            for rel_path, handle in bundle.artifacts or []:
+                with handle:
+                    if str(rel_path) != STATE_FILE:
+                        continue
+                    state = pickle.load(handle)
+                    self.shell.user_ns.update({name: importlib.import_module(module)
+                                               for name, module in state["modules"].items()})
+                    self.shell.user_ns.update(state["values"])
+        self.deferred = []
+
+    def _store(self, key, source, outputs, before):
+        """Cache outputs and the names the chunk (re)bound or mutated."""
+        from jupyter_cache.base import CacheBundleIn
+        from jupyter_cache.cache.main import NbArtifacts
+
+        ns = self.shell.user_ns
+        changed = {}
+        for name in user_names(ns):
+            value = ns[name]
+            old = before.get(name)
+            if old is None or old[0] != id(value) or old[1] != fingerprint(value):
+                changed[name] = value
+        # Modules are re-imported by name; everything else must pickle
+        modules = {name: value.__name__ for name, value in changed.items()
+                   if isinstance(value, types.ModuleType)}
+        values = {name: value for name, value in changed.items() if name not in modules}
+        state = None
+        if not any(defined_here(value) for value in values.values()):
+            try:
+                state = pickle.dumps({"modules": modules, "values": values})
+            except Exception:  # open files, lambdas, generators...
+                pass
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            if state is not None:
+                (Path(tmp) / STATE_FILE).write_bytes(state)
+                paths.append(str(Path(tmp) / STATE_FILE))
+            bundle = CacheBundleIn(
+                _chunk_notebook(key, source, outputs),
+                uri=f"{os.getcwd()}#{self.hits + self.misses}",
+                artifacts=NbArtifacts(paths, tmp),
+                data={"complete": state is not None, "names": sorted(changed)},
+            )
+            self.cache.cache_notebook_bundle(bundle, check_validity=False, overwrite=True)
+
+
+def load_ipython_extension(shell):
+    global _extension
+    if _extension is None:
+        _extension = ChunkCache(shell)
+        shell.run_cell = _extension.run_cell
+
+
+def unload_ipython_extension(shell):
+    global _extension
+    if _extension is not None:
+        shell.run_cell = _extension._run_cell
+        print(f"chunk_cache: {_extension.hits} hit(s), {_extension.misses} miss(es)")
+        _extension = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the chunk cache.")
+    parser.add_argument("command", choices=["info", "clear"])
+    args = parser.parse_args()
+
+    if args.command == "clear":
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        print(f"  Removed {CACHE_DIR}")
+        return
+
+    from jupyter_cache import get_cache
+
+    records = get_cache(CACHE_DIR).list_cache_records()
+    complete = sum(bool(r.data.get("complete")) for r in records)
+    size = sum(p.stat().st_size for p in CACHE_DIR.rglob("*") if p.is_file())
+    print(f"  {CACHE_DIR}: {len(records)} chunk(s), {complete} with restorable state, "
+          f"{size / 1e6:.1f} MB")
+    for record in sorted(records, key=lambda r: r.created)[-20:]:
+        names = ", ".join(record.data.get("names", [])[:6])
+        print(f"    {record.created:%Y-%m-%d %H:%M}  {record.uri}  [{names}]")
+
+
+if __name__ == "__main__":
+    main()
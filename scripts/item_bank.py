@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+On-disk item bank format with memory-mapped parameter columns.
+
+Calibrated parameters (``beta_hat``/``theta_hat`` from the Rasch fits,
+``V``, ``Z``, ``U`` from ``JML_trainer`` + ``standardize_V_Z_U_promax``)
+are written to a bank directory:
+
+    helm.bank/
+        bank.json          schema version, shapes, column index,
+                           benchmark names, calibration provenance
+        item_ids.npy       fixed-width unicode, one ID per item
+        benchmark.npy      int32 code into bank.json["benchmarks"]
+        V.npy, V_se.npy    (M, K) loadings and SEs
+        Z.npy, Z_se.npy    (M,) intercepts and SEs
+        beta.npy, ...      any other item- or model-side column
+        model_ids.npy      optional, for model-side columns (U, theta)
+
+Every column is a plain ``.npy`` file opened with ``mmap_mode="r"``, so
+scoring workers, CAT simulators and design tools that open the same bank
+share one copy of the data through the OS page cache and start without
+unpickling anything.
+
+Usage:
+    python scripts/item_bank.py info path/to/helm.bank
+"""
+
+import argparse
+import datetime
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+SCHEMA_VERSION = 1
+MANIFEST = "bank.json"
+
+# Known columns: name -> (axis, trailing dims). "K" is the factor dimension.
+# Any other column is accepted as long as its first axis matches "item" or
+# "model"; the schema only pins down the names the tools rely on.
+SCHEMA = {
+    "beta":     ("item", ()),
+    "V":        ("item", ("K",)),
+    "Z":        ("item", ()),
+    "a":        ("item", ()),
+    "c":        ("item", ()),
+    "theta":    ("model", ()),
+    "U":        ("model", ("K",)),
+}
+
+
+def _to_numpy(x):
+    """Accept numpy arrays, lists and (possibly CUDA) torch tensors."""
+    if hasattr(x, "detach"):
+        x = x.detach().cpu().numpy()
+    return np.asarray(x)
+
+
+def _normalize(name, arr):
+    # Z is (M, 1) in the factor model code; store it flat
+    if name in ("Z", "Z_se") and arr.ndim == 2 and arr.shape[1] == 1:
+        arr = arr[:, 0]
+    if arr.dtype.kind == "f":
+        arr = arr.astype(np.float32 if arr.dtype == np.float32 else np.float64)
+    return np.ascontiguousarray(arr)
+
+
+def _base(name):
+    return name[:-3] if name.endswith("_se") else name
+
+
+def write_item_bank(path, item_ids, params, ses=None, benchmarks=None,
+                    model_ids=None, provenance=None, overwrite=False):
+    """
+    Write a calibrated item bank to ``path``.
+
+    Parameters
+    ----------
+    path : str or Path
+        Bank directory to create (conventionally ``<name>.bank``)
+    item_ids : sequence of str (M,)
+        Stable item identifiers (e.g. DataFrame column labels)
+    params : dict[str, array-like]
+        Parameter columns, e.g. ``{"V": V, "Z": Z}`` or ``{"beta": beta_hat}``.
+        Item-side columns have M rows, model-side columns (``U``,
+        ``theta``) have N rows and require ``model_ids``.
+    ses : dict[str, array-like], optional
+        Standard errors keyed by parameter name; stored as ``<name>_se``
+    benchmarks : sequence of str (M,), optional
+        Benchmark membership of each item
+    model_ids : sequence of str (N,), optional
+        Identifiers for the rows of model-side columns
+    provenance : dict, optional
+        Calibration details (method, K, rotation, data hash, ...). The
+        creation time and column list are added automatically.
+    overwrite : bool
+        Replace an existing bank at ``path``
+    """
+    path = Path(path)
+    if path.exists() and not overwrite:
+        raise FileExistsError(f"{path} exists (pass overwrite=True to replace)")
+
+    item_ids = np.asarray([str(i) for i in item_ids])
+    M = len(item_ids)
+    N = None if model_ids is None else len(model_ids)
+
+    columns = {name: _normalize(name, _to_numpy(v)) for name, v in params.items()}
+    for name, v in (ses or {}).items():
+        columns[f"{name}_se"] = _normalize(f"{name}_se", _to_numpy(v))
+
+    K = None
+    axes = {}
+    for name, arr in columns.items():
+        axis, dims = SCHEMA.get(_base(name), (None, ()))
+        n_rows = arr.shape[0] if arr.ndim else None
+        if axis is None:
+            axis = "item" if n_rows == M else "model"
+        expected = M if axis == "item" else N
+        if expected is None:
+            raise ValueError(f"Column '{name}' is model-side; pass model_ids")
+        if n_rows != expected:
+            raise ValueError(f"Column '{name}' has {n_rows} rows, expected {expected} ({axis}s)")
+        if dims == ("K",):
+            if arr.ndim != 2:
+                raise ValueError(f"Column '{name}' must be 2-D (rows, K)")
+            if K is not None and arr.shape[1] != K:
+                raise ValueError(f"Column '{name}' has K={arr.shape[1]}, expected K={K}")
+            K = arr.shape[1]
+        elif _base(name) in SCHEMA and arr.ndim != 1:
+            raise ValueError(f"Column '{name}' must be 1-D, got shape {arr.shape}")
+        axes[name] = axis
+
+    manifest = {
+        "schema_version": SCHEMA_VERSION,
+        "n_items": M,
+        "n_models": N,
+        "K": K,
+        "columns": {},
+        "benchmarks": [],
+        "provenance": dict(provenance or {}),
+    }
+    manifest["provenance"].setdefault(
+        "created", datetime.datetime.now(datetime.timezone.utc).isoformat())
+
+    # Write into a sibling temp dir and rename, so readers never observe a
+    # half-written bank
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=path.name + ".", dir=path.parent))
+    try:
+        np.save(tmp / "item_ids.npy", item_ids)
+        if model_ids is not None:
+            np.save(tmp / "model_ids.npy", np.asarray([str(i) for i in model_ids]))
+        if benchmarks is not None:
+            names, codes = np.unique(np.asarray([str(b) for b in benchmarks]),
+                                     return_inverse=True)
+            if len(codes) != M:
+                raise ValueError(f"benchmarks has {len(codes)} entries, expected {M}")
+            np.save(tmp / "benchmark.npy", codes.astype(np.int32))
+            manifest["benchmarks"] = names.tolist()
+
+        for name, arr in columns.items():
+            np.save(tmp / f"{name}.npy", arr)
+            manifest["columns"][name] = {
+                "file": f"{name}.npy", "axis": axes[name],
+                "dtype": arr.dtype.str, "shape": list(arr.shape),
+            }
+
+        with open(tmp / MANIFEST, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return path
+
+
+class ItemBank:
+    """
+    Read-only view of an item bank directory.
+
+    Parameter columns are memory-mapped on first access, so opening a bank
+    only reads ``bank.json``.
+
+    Examples
+    --------
+    >>> bank = ItemBank.open("helm.bank")
+    >>> V, Z = bank["V"], bank["Z"]          # np.memmap, no copy
+    >>> mmlu = bank.items_in("mmlu")         # indices of one benchmark
+    """
+
+    def __init__(self, path, manifest):
+        self.path = Path(path)
+        self.manifest = manifest
+        self._cache = {}
+        self._index = None
+
+    @classmethod
+    def open(cls, path):
+        path = Path(path)
+        with open(path / MANIFEST) as f:
+            manifest = json.load(f)
+        if manifest.get("schema_version") != SCHEMA_VERSION:
+            raise ValueError(f"{path}: unsupported item bank schema "
+                             f"{manifest.get('schema_version')} (expected {SCHEMA_VERSION})")
+        return cls(path, manifest)
+
+    def _load(self, filename):
+        if filename not in self._cache:
+            self._cache[filename] = np.load(self.path / filename, mmap_mode="r")
+        return self._cache[filename]
+
+    def __getitem__(self, name):
+        try:
+            info = self.manifest["columns"][name]
+        except KeyError:
+            raise KeyError(f"Item bank has no column '{name}' "
+                           f"(available: {', '.join(self.columns)})") from None
+        return self._load(info["file"])
+
+    def __contains__(self, name):
+        return name in self.manifest["columns"]
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    @property
+    def columns(self):
+        return list(self.manifest["columns"])
+
+    @property
+    def n_items(self):
+        return self.manifest["n_items"]
+
+    @property
+    def K(self):
+        return self.manifest["K"]
+
+    @property
+    def provenance(self):
+        return self.manifest["provenance"]
+
+    @property
+    def benchmarks(self):
+        return self.manifest["benchmarks"]
+
+    @property
+    def item_ids(self):
+        return self._load("item_ids.npy")
+
+    @property
+    def model_ids(self):
+        return self._load("model_ids.npy") if self.manifest["n_models"] else None
+
+    def item_index(self, item_id):
+        """Position of an item ID in the bank (O(1) after the first call)."""
+        if self._index is None:
+            self._index = {str(i): k for k, i in enumerate(self.item_ids)}
+        return self._index[str(item_id)]
+
+    def items_in(self, benchmark):
+        """Indices of the items belonging to ``benchmark``."""
+        if not self.benchmarks:
+            raise ValueError("Item bank was written without benchmark membership")
+        code = self.benchmarks.index(benchmark)
+        return np.flatnonzero(self._load("benchmark.npy") == code)
+
+    def __repr__(self):
+        return (f"ItemBank({str(self.path)!r}, items={self.n_items}, K={self.K}, "
+                f"columns={self.columns})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect an item bank.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="Print schema and provenance")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    bank = ItemBank.open(args.path)
+    m = bank.manifest
+    print(f"Item bank: {bank.path}")
+    print(f"  Items: {m['n_items']}, models: {m['n_models']}, K: {m['K']}")
+    print(f"  Benchmarks: {len(m['benchmarks'])}")
+    for name, col in m["columns"].items():
+        print(f"  {name:<10} {col['axis']:<6} {col['dtype']:<6} {tuple(col['shape'])}")
+    print("  Provenance:")
+    for key, value in m["provenance"].items():
+        print(f"    {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
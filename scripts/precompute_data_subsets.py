@@ -1,37 +1,66 @@
 #!/usr/bin/env python3
 """
 Pre-compute small data subsets for interactive pyodide visualization in Chapter 1.
-Saves subsets as JSON files that can be loaded in the browser.
+Saves subsets in the compact binary format of response_codec.py (bitplanes
+plus a small JSON header), which the browser decodes with one frombuffer.
+Pass --json to also write the legacy nested-list JSON files.
+
+The source matrices are read from chunked response stores (see
+response_store.py). On first use each pickled DataFrame is converted into a
+store under STORE_DIR; later runs only read the tiles the subset needs.
+
+Subsets are stratified rather than taken from the top-left corner: one
+streaming pass over the store computes per-model accuracy and per-item
+difficulty (proportion correct), then models and items are sampled one per
+quantile stratum so every size tier spans the full ability and difficulty
+range. All tiers are cut from a single read of the union of selected rows
+and columns, and the HELM and Open LLM datasets are processed concurrently.
 
 Usage:
     python scripts/precompute_data_subsets.py
+    python scripts/precompute_data_subsets.py --seed 1
+    python scripts/precompute_data_subsets.py --json
 """
 
+import argparse
 import json
-import pickle
+import os
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from response_codec import encode_responses
+from response_store import ResponseStore, convert_pickle
+
 # Configuration
-N_TAKERS = 50  # Number of test takers (models) to include
-N_ITEMS = 100  # Number of items (questions) to include
+# Size tiers as (suffix, n_takers, n_items); the first tier keeps the
+# historical helm_subset / openllm_subset names.
+TIERS = [
+    ("", 50, 100),
+    ("_200x1000", 200, 1000),
+]
+MIN_ITEM_COVERAGE = 0.5  # Prefer items answered by at least this fraction of models
+SEED = 0
 OUTPUT_DIR = Path(__file__).parent.parent / "src" / "data"
+STORE_DIR = Path(os.environ.get("AIMS_STORE_DIR", Path.home() / ".cache/aims/response_stores"))
+
+DATASETS = [
+    # (name, label, source pickle, store name)
+    ("helm", "HELM Benchmark", "HELM_benchmark.pkl", "helm.responses"),
+    ("openllm", "Open LLM Leaderboard", "benchmark_data_open_llm_full_no_arc.pkl",
+     "openllm.responses"),
+]
+
 
 def numpy_to_list(arr):
-    """Convert numpy array to nested list, handling NaN values."""
-    result = []
-    for row in arr:
-        row_data = []
-        for val in row:
-            if np.isnan(val):
-                row_data.append(None)
-            else:
-                row_data.append(float(val))
-        result.append(row_data)
-    return result
+    """Convert numpy array to nested list, mapping NaN to None."""
+    out = arr.astype(object)
+    out[np.isnan(arr)] = None
+    return out.tolist()
 
-def main():
-    # Use cached data
+
+def find_cache_path():
+    """Locate the cached stair-lab/reeval_fa snapshot."""
     cache_path = Path("/lfs/skampere2/0/sttruong/.cache/huggingface/hub/datasets--stair-lab--reeval_fa/snapshots/a0c7e788bbec27820dab1c9da39b56c43f792926")
 
     if not cache_path.exists():
@@ -43,65 +72,131 @@ def main():
                 cache_path = snapshots[0]
         else:
             raise FileNotFoundError("No cached data found. Please run with HuggingFace authentication first.")
+    return cache_path
+
+
+def open_store(cache_path, pickle_name, store_name):
+    """Open a response store, converting it from the cached pickle if needed."""
+    store_path = STORE_DIR / store_name
+    if not (store_path / "store.json").exists():
+        print(f"  Converting {pickle_name} -> {store_path} (one-time)")
+        convert_pickle(cache_path / "data" / pickle_name, store_path, overwrite=True)
+    return ResponseStore.open(store_path)
+
+
+def marginal_stats(store):
+    """One streaming pass: observed counts and correct counts per row and column."""
+    N, M = store.shape
+    row_obs, row_correct = np.zeros(N), np.zeros(N)
+    col_obs, col_correct = np.zeros(M), np.zeros(M)
+    for rows, block in store.iter_row_blocks():
+        observed = ~np.isnan(block)
+        correct = np.nan_to_num(block)
+        row_obs[rows] = observed.sum(axis=1)
+        row_correct[rows] = correct.sum(axis=1)
+        col_obs += observed.sum(axis=0)
+        col_correct += correct.sum(axis=0)
+    return row_obs, row_correct, col_obs, col_correct
+
+
+def stratified_sample(candidates, scores, n, rng):
+    """
+    Draw one candidate from each of n equal-count quantile strata of ``scores``.
+
+    Returns the selected candidates in their original (index) order.
+    """
+    if n >= len(candidates):
+        return np.sort(candidates)
+    order = candidates[np.argsort(scores, kind="stable")]
+    # Stratum k covers sorted positions [k L / n, (k + 1) L / n); strata are
+    # at least one position wide, so the draws are distinct
+    pos = np.floor((np.arange(n) + rng.random(n)) * len(order) / n).astype(int)
+    return np.sort(order[pos])
+
+
+def select_subsets(row_obs, row_correct, col_obs, col_correct, tiers, rng):
+    """Choose stratified (rows, cols) for every size tier."""
+    N = len(row_obs)
+    rows_ok = np.flatnonzero(row_obs > 0)
+    ability = row_correct[rows_ok] / row_obs[rows_ok]
+
+    coverage = col_obs / max(N, 1)
+    cols_ok = np.flatnonzero(coverage >= MIN_ITEM_COVERAGE)
+    max_items = max(n_items for _, _, n_items in tiers)
+    if len(cols_ok) < max_items:
+        # Too few well-covered items: fall back to the best-covered ones
+        cols_ok = np.sort(np.argsort(-coverage, kind="stable")[:max_items])
+        cols_ok = cols_ok[col_obs[cols_ok] > 0]
+    difficulty = 1 - col_correct[cols_ok] / col_obs[cols_ok]
+
+    selections = {}
+    for suffix, n_takers, n_items in tiers:
+        rows = stratified_sample(rows_ok, ability, n_takers, rng)
+        cols = stratified_sample(cols_ok, difficulty, n_items, rng)
+        selections[suffix] = (rows, cols)
+    return selections
+
+
+def export_dataset(name, label, pickle_name, store_name, cache_path, seed=SEED,
+                   write_json=False):
+    """Export all size tiers for one dataset. Returns printable log lines."""
+    log = [f"\nProcessing {label} data..."]
+    store = open_store(cache_path, pickle_name, store_name)
+    N, M = store.shape
+    rng = np.random.default_rng(seed)
+
+    stats = marginal_stats(store)
+    selections = select_subsets(*stats, TIERS, rng)
+
+    # Read the union of all tiers once, then cut each tier out of it
+    all_rows = np.unique(np.concatenate([r for r, _ in selections.values()]))
+    all_cols = np.unique(np.concatenate([c for _, c in selections.values()]))
+    block = store.read(all_rows, all_cols)
+    row_ids, col_ids = np.asarray(store.row_ids), np.asarray(store.col_ids)
+
+    log.append(f"  Full: {N} x {M}")
+    for suffix, _, _ in TIERS:
+        rows, cols = selections[suffix]
+        subset = block[np.ix_(np.searchsorted(all_rows, rows),
+                              np.searchsorted(all_cols, cols))]
+        models, items = row_ids[rows].tolist(), col_ids[cols].tolist()
+        out_path = OUTPUT_DIR / f"{name}_subset{suffix}.bin"
+        out_path.write_bytes(encode_responses(subset, models, items,
+                                              full_shape=[int(N), int(M)],
+                                              selection="stratified"))
+        if write_json:
+            output = {
+                "full_shape": [int(N), int(M)],
+                "subset_shape": [len(rows), len(cols)],
+                "selection": "stratified",
+                "models": models,
+                "items": items,
+                "data": numpy_to_list(subset),
+            }
+            with open(out_path.with_suffix(".json"), "w") as f:
+                json.dump(output, f)
+        missing = np.isnan(subset).mean() * 100
+        log.append(f"  Subset: {len(rows)} x {len(cols)} ({missing:.0f}% missing) -> {out_path}")
+    return log
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export stratified demo subsets.")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--json", action="store_true",
+                        help="Also write the legacy nested-list JSON files")
+    args = parser.parse_args()
 
+    cache_path = find_cache_path()
     print(f"Using cached data from: {cache_path}")
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-    # Process HELM data
-    print("\nProcessing HELM Benchmark data...")
-    with open(cache_path / "data/HELM_benchmark.pkl", "rb") as f:
-        helm_df = pickle.load(f)
-
-    # DataFrame: rows are models, columns are questions
-    helm_matrix = helm_df.values  # Convert to numpy array
-    helm_n_takers = min(N_TAKERS, helm_matrix.shape[0])
-    helm_n_items = min(N_ITEMS, helm_matrix.shape[1])
-    helm_subset = helm_matrix[:helm_n_takers, :helm_n_items]
-
-    # Get model names and item info for subset
-    helm_models = list(helm_df.index[:helm_n_takers])
-
-    helm_output = {
-        "full_shape": [int(helm_matrix.shape[0]), int(helm_matrix.shape[1])],
-        "subset_shape": [helm_n_takers, helm_n_items],
-        "models": helm_models,
-        "data": numpy_to_list(helm_subset)
-    }
-
-    helm_path = OUTPUT_DIR / "helm_subset.json"
-    with open(helm_path, "w") as f:
-        json.dump(helm_output, f)
-    print(f"  Full: {helm_matrix.shape[0]} x {helm_matrix.shape[1]}")
-    print(f"  Subset: {helm_n_takers} x {helm_n_items}")
-    print(f"  Saved to: {helm_path}")
-
-    # Process Open LLM data
-    print("\nProcessing Open LLM Leaderboard data...")
-    with open(cache_path / "data/benchmark_data_open_llm_full_no_arc.pkl", "rb") as f:
-        openllm_df = pickle.load(f)
-
-    openllm_matrix = openllm_df.values
-    openllm_n_takers = min(N_TAKERS, openllm_matrix.shape[0])
-    openllm_n_items = min(N_ITEMS, openllm_matrix.shape[1])
-    openllm_subset = openllm_matrix[:openllm_n_takers, :openllm_n_items]
-
-    # Get model names for subset
-    openllm_models = list(openllm_df.index[:openllm_n_takers])
-
-    openllm_output = {
-        "full_shape": [int(openllm_matrix.shape[0]), int(openllm_matrix.shape[1])],
-        "subset_shape": [openllm_n_takers, openllm_n_items],
-        "models": openllm_models,
-        "data": numpy_to_list(openllm_subset)
-    }
-
-    openllm_path = OUTPUT_DIR / "openllm_subset.json"
-    with open(openllm_path, "w") as f:
-        json.dump(openllm_output, f)
-    print(f"  Full: {openllm_matrix.shape[0]} x {openllm_matrix.shape[1]}")
-    print(f"  Subset: {openllm_n_takers} x {openllm_n_items}")
-    print(f"  Saved to: {openllm_path}")
+    with ProcessPoolExecutor(max_workers=len(DATASETS)) as pool:
+        futures = [pool.submit(export_dataset, *dataset, cache_path, args.seed, args.json)
+                   for dataset in DATASETS]
+        for future in futures:
+            print("\n".join(future.result()))
 
     print("\nDone! Data subsets saved to src/data/")
 
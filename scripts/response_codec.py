@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Compact binary encoding for response subsets served to the pyodide cells.
+
+Layout (little-endian):
+
+    bytes 0-7     magic b"AIMSRSP1"
+    bytes 8-11    uint32 header length H
+    bytes 12..    UTF-8 JSON header (shape, models, items, full_shape, ...)
+                  padded with spaces so the payload starts on an 8-byte boundary
+    payload       np.packbits of a (2, N, M) bool array:
+                  plane 0 = response is 1, plane 1 = response is missing
+
+A 50 x 100 subset is ~1.3 kB of payload instead of ~27 kB of nested JSON,
+and decoding is one ``frombuffer`` + ``unpackbits``:
+
+    bits = np.unpackbits(np.frombuffer(buf, np.uint8, offset=off), count=2 * N * M)
+    Y = bits.reshape(2, N, M)[0].astype(float)
+    Y[bits.reshape(2, N, M)[1] == 1] = np.nan
+
+The same bytes can be served raw (``.bin``) or base64-encoded (``.b64``) for
+hosts that mangle binary resources.
+
+Usage:
+    python scripts/response_codec.py src/data/helm_subset.json
+    python scripts/response_codec.py src/data/*.json --base64
+"""
+
+import argparse
+import base64
+import json
+import struct
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"AIMSRSP1"
+VERSION = 1
+
+
+def encode_responses(matrix, models=None, items=None, **extra):
+    """
+    Encode a binary response matrix (NaN = missing) to bytes.
+
+    Parameters
+    ----------
+    matrix : ndarray (N, M)
+        Responses in {0, 1} with NaN for missing entries
+    models, items : sequence of str, optional
+        Row and column labels stored in the header
+    **extra
+        Additional JSON-serializable header fields (e.g. ``full_shape``)
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    missing = np.isnan(matrix)
+    observed = matrix[~missing]
+    if not np.all((observed == 0) | (observed == 1)):
+        raise ValueError("Only binary responses (0, 1 or NaN) can be encoded")
+
+    header = {"version": VERSION, "shape": list(matrix.shape), **extra}
+    if models is not None:
+        header["models"] = [str(m) for m in models]
+    if items is not None:
+        header["items"] = [str(i) for i in items]
+    raw = json.dumps(header, separators=(",", ":")).encode()
+    raw += b" " * (-(len(MAGIC) + 4 + len(raw)) % 8)
+
+    planes = np.stack([np.nan_to_num(matrix) == 1, missing])
+    return MAGIC + struct.pack("<I", len(raw)) + raw + np.packbits(planes).tobytes()
+
+
+def decode_responses(buf):
+    """
+    Decode bytes (or a base64 string) produced by ``encode_responses``.
+
+    Returns
+    -------
+    Y : ndarray (N, M) float with NaN for missing
+    header : dict
+    """
+    if isinstance(buf, str):
+        buf = base64.b64decode(buf)
+    buf = bytes(buf) if isinstance(buf, memoryview) else buf
+    if buf[:8] != MAGIC:
+        raise ValueError("Not an AIMS response subset (bad magic)")
+    (header_len,) = struct.unpack_from("<I", buf, 8)
+    header = json.loads(buf[12:12 + header_len])
+    N, M = header["shape"]
+
+    bits = np.unpackbits(np.frombuffer(buf, np.uint8, offset=12 + header_len),
+                         count=2 * N * M).reshape(2, N, M)
+    Y = bits[0].astype(float)
+    Y[bits[1] == 1] = np.nan
+    return Y, header
+
+
+def convert_json(json_path, base64_out=False):
+    """Convert a legacy ``*_subset.json`` file to the binary format."""
+    json_path = Path(json_path)
+    with open(json_path) as f:
+        subset = json.load(f)
+    matrix = np.array(subset["data"], dtype=float)  # None -> NaN
+    extra = {k: v for k, v in subset.items()
+             if k not in ("data", "models", "items", "subset_shape")}
+    payload = encode_responses(matrix, subset.get("models"), subset.get("items"), **extra)
+    if base64_out:
+        out_path = json_path.with_suffix(".b64")
+        out_path.write_text(base64.b64encode(payload).decode())
+    else:
+        out_path = json_path.with_suffix(".bin")
+        out_path.write_bytes(payload)
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert JSON subsets to the binary format.")
+    parser.add_argument("json_files", nargs="+")
+    parser.add_argument("--base64", action="store_true",
+                        help="Write base64 text (.b64) instead of raw bytes (.bin)")
+    args = parser.parse_args()
+
+    for path in args.json_files:
+        out_path = convert_json(path, base64_out=args.base64)
+        before, after = Path(path).stat().st_size, out_path.stat().st_size
+        print(f"  {path}: {before / 1024:.1f} kB -> {out_path} ({after / 1024:.1f} kB)")
+
+
+if __name__ == "__main__":
+    main()
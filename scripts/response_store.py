@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Chunked, memory-mapped storage for binary response matrices.
+
+The raw benchmark data ship as pickled DataFrames (``HELM_benchmark.pkl``,
+``benchmark_data_open_llm_full_no_arc.pkl``) that have to be unpickled in
+full before any slice can be taken. A response store keeps the same matrix
+(rows = models, columns = items, values in {0, 1, NaN}) as a grid of tiles:
+
+    helm.responses/
+        store.json      shape, tile shape, encoding version
+        row_ids.npy     model names (fixed-width unicode)
+        col_ids.npy     item IDs (fixed-width unicode)
+        tiles.npy       (n_row_tiles, n_col_tiles, 4) int64:
+                        kind, byte offset, byte length, observed count
+        data.bin        concatenated tile payloads
+
+Each tile is stored in whichever encoding is smaller:
+
+- dense:  packed observed-mask bitplane followed by packed value bitplane
+          (2 bits per cell)
+- sparse: uint32 flat offsets of observed cells followed by their packed
+          values (~33 bits per observed cell)
+- empty:  nothing (no observed cells)
+
+``data.bin`` is memory-mapped, so reading an arbitrary set of rows and
+columns only touches the tiles that intersect it.
+
+The book's chapters read ``src/data/helm.responses`` through
+``load_response_matrix``, which falls back to the ``data/Y_matrix.pt``
+tensor until the store has been built from it:
+
+    cd src && python ../scripts/response_store.py convert data/Y_matrix.pt data/helm.responses
+
+Usage:
+    python scripts/response_store.py convert HELM_benchmark.pkl helm.responses
+    python scripts/response_store.py convert data/Y_matrix.pt data/helm.responses
+    python scripts/response_store.py info helm.responses
+"""
+
+import argparse
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+FORMAT_VERSION = 1
+DEFAULT_STORE = "data/helm.responses"  # Relative to src/, where chapters run
+DEFAULT_TENSOR = "data/Y_matrix.pt"    # Dense tensor, missing entries as -1
+TILE_SHAPE = (256, 4096)  # rows x columns per tile
+
+DENSE, SPARSE, EMPTY = 0, 1, 2
+
+
+def _encode_tile(block):
+    """Encode a (r, c) float block with NaN for missing. Returns (kind, payload, n_obs)."""
+    observed = ~np.isnan(block)
+    n_obs = int(observed.sum())
+    if n_obs == 0:
+        return EMPTY, b"", 0
+
+    values = block[observed]
+    if not np.all((values == 0) | (values == 1)):
+        raise ValueError("Response store only holds binary responses (0, 1 or NaN)")
+
+    dense_bytes = 2 * ((block.size + 7) // 8)
+    sparse_bytes = 4 * n_obs + (n_obs + 7) // 8
+    if sparse_bytes < dense_bytes:
+        flat_idx = np.flatnonzero(observed).astype("<u4")
+        payload = flat_idx.tobytes() + np.packbits(values.astype(bool)).tobytes()
+        return SPARSE, payload, n_obs
+
+    ones = np.nan_to_num(block, nan=0.0).astype(bool)
+    payload = np.packbits(observed).tobytes() + np.packbits(ones).tobytes()
+    return DENSE, payload, n_obs
+
+
+def _decode_tile(kind, buf, n_obs, shape):
+    """Inverse of ``_encode_tile``: returns a float32 block with NaN for missing."""
+    out = np.full(shape, np.nan, dtype=np.float32)
+    size = shape[0] * shape[1]
+    if kind == EMPTY:
+        return out
+    if kind == SPARSE:
+        flat_idx = np.frombuffer(buf, dtype="<u4", count=n_obs)
+        values = np.unpackbits(np.frombuffer(buf, dtype=np.uint8, offset=4 * n_obs),
+                               count=n_obs)
+        out.reshape(-1)[flat_idx] = values
+        return out
+    nb = (size + 7) // 8
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    observed = np.unpackbits(raw[:nb], count=size).astype(bool)
+    values = np.unpackbits(raw[nb:2 * nb], count=size)
+    flat = out.reshape(-1)
+    flat[observed] = values[observed]
+    return out
+
+
+def write_response_store(path, matrix, row_ids, col_ids, tile_shape=TILE_SHAPE,
+                         overwrite=False):
+    """
+    Write a response matrix to a chunked store.
+
+    Parameters
+    ----------
+    path : str or Path
+        Store directory to create (conventionally ``<name>.responses``)
+    matrix : array-like (N, M)
+        Responses in {0, 1} with NaN for missing entries. Read one row band
+        at a time, so a ``np.memmap`` source is never fully materialized.
+    row_ids, col_ids : sequence
+        Model names and item IDs
+    tile_shape : (int, int)
+        Rows and columns per tile
+    """
+    path = Path(path)
+    if path.exists() and not overwrite:
+        raise FileExistsError(f"{path} exists (pass overwrite=True to replace)")
+
+    N, M = matrix.shape
+    if len(row_ids) != N or len(col_ids) != M:
+        raise ValueError(f"ID lengths ({len(row_ids)}, {len(col_ids)}) do not match "
+                         f"matrix shape {matrix.shape}")
+    tr, tc = tile_shape
+    n_rt, n_ct = -(-N // tr), -(-M // tc)
+    tiles = np.zeros((n_rt, n_ct, 4), dtype=np.int64)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=path.name + ".", dir=path.parent))
+    try:
+        offset = 0
+        with open(tmp / "data.bin", "wb") as f:
+            for i in range(n_rt):
+                band = np.asarray(matrix[i * tr:(i + 1) * tr], dtype=np.float64)
+                for j in range(n_ct):
+                    kind, payload, n_obs = _encode_tile(band[:, j * tc:(j + 1) * tc])
+                    f.write(payload)
+                    tiles[i, j] = (kind, offset, len(payload), n_obs)
+                    offset += len(payload)
+
+        np.save(tmp / "tiles.npy", tiles)
+        np.save(tmp / "row_ids.npy", np.asarray([str(r) for r in row_ids]))
+        np.save(tmp / "col_ids.npy", np.asarray([str(c) for c in col_ids]))
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "shape": [int(N), int(M)],
+            "tile_shape": [int(tr), int(tc)],
+            "n_observed": int(tiles[..., 3].sum()),
+            "tile_kinds": {
+                "dense": int((tiles[..., 0] == DENSE).sum()),
+                "sparse": int((tiles[..., 0] == SPARSE).sum()),
+                "empty": int((tiles[..., 0] == EMPTY).sum()),
+            },
+        }
+        with open(tmp / "store.json", "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return path
+
+
+def _as_index(sel, n):
+    """Normalize None / slice / int array / bool mask to an int index array."""
+    if sel is None:
+        return np.arange(n)
+    if isinstance(sel, slice):
+        return np.arange(n)[sel]
+    sel = np.asarray(sel)
+    if sel.dtype == bool:
+        return np.flatnonzero(sel)
+    sel = sel.astype(np.int64)
+    sel[sel < 0] += n
+    if sel.size and (sel.min() < 0 or sel.max() >= n):
+        raise IndexError(f"Index out of range for axis of length {n}")
+    return sel
+
+
+class ResponseStore:
+    """
+    Read-only view of a response store.
+
+    Examples
+    --------
+    >>> store = ResponseStore.open("helm.responses")
+    >>> Y = store.read(rows=slice(0, 50), cols=slice(0, 100))   # (50, 100)
+    >>> Y = store.read_ids(models=["openai/gpt-4-0613"])
+    """
+
+    def __init__(self, path, manifest):
+        self.path = Path(path)
+        self.manifest = manifest
+        self.shape = tuple(manifest["shape"])
+        self.tile_shape = tuple(manifest["tile_shape"])
+        self._tiles = np.load(self.path / "tiles.npy")
+        self._data = None
+        self._row_ids = self._col_ids = None
+        self._row_index = self._col_index = None
+
+    @classmethod
+    def open(cls, path):
+        path = Path(path)
+        with open(path / "store.json") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported response store format "
+                             f"{manifest.get('format_version')} (expected {FORMAT_VERSION})")
+        return cls(path, manifest)
+
+    @property
+    def data(self):
+        if self._data is None:
+            if (self.path / "data.bin").stat().st_size == 0:
+                self._data = np.zeros(0, dtype=np.uint8)
+            else:
+                self._data = np.memmap(self.path / "data.bin", dtype=np.uint8, mode="r")
+        return self._data
+
+    @property
+    def row_ids(self):
+        if self._row_ids is None:
+            self._row_ids = np.load(self.path / "row_ids.npy", mmap_mode="r")
+        return self._row_ids
+
+    @property
+    def col_ids(self):
+        if self._col_ids is None:
+            self._col_ids = np.load(self.path / "col_ids.npy", mmap_mode="r")
+        return self._col_ids
+
+    def row_index(self, ids):
+        if self._row_index is None:
+            self._row_index = {str(r): i for i, r in enumerate(self.row_ids)}
+        return np.array([self._row_index[str(r)] for r in ids], dtype=np.int64)
+
+    def col_index(self, ids):
+        if self._col_index is None:
+            self._col_index = {str(c): j for j, c in enumerate(self.col_ids)}
+        return np.array([self._col_index[str(c)] for c in ids], dtype=np.int64)
+
+    def _tile(self, i, j):
+        kind, offset, nbytes, n_obs = (int(v) for v in self._tiles[i, j])
+        tr, tc = self.tile_shape
+        shape = (min(tr, self.shape[0] - i * tr), min(tc, self.shape[1] - j * tc))
+        return _decode_tile(kind, self.data[offset:offset + nbytes], n_obs, shape)
+
+    def read(self, rows=None, cols=None, missing=np.nan, dtype=np.float32):
+        """
+        Read a sub-matrix, decoding only the tiles it intersects.
+
+        Parameters
+        ----------
+        rows, cols : None, slice, int array or bool mask
+            Selection along each axis (``None`` = everything), in the
+            order requested
+        missing : float
+            Fill value for unobserved cells (e.g. -1 for ``Y_missing``)
+
+        Returns
+        -------
+        ndarray (len(rows), len(cols))
+        """
+        r_idx = _as_index(rows, self.shape[0])
+        c_idx = _as_index(cols, self.shape[1])
+        out = np.full((len(r_idx), len(c_idx)), np.nan, dtype=np.float32)
+        tr, tc = self.tile_shape
+
+        r_tile, c_tile = r_idx // tr, c_idx // tc
+        for i in np.unique(r_tile):
+            r_pos = np.flatnonzero(r_tile == i)
+            for j in np.unique(c_tile):
+                c_pos = np.flatnonzero(c_tile == j)
+                if self._tiles[i, j, 0] == EMPTY:
+                    continue
+                block = self._tile(i, j)
+                out[np.ix_(r_pos, c_pos)] = block[np.ix_(r_idx[r_pos] - i * tr,
+                                                          c_idx[c_pos] - j * tc)]
+        if not np.isnan(missing):
+            out[np.isnan(out)] = missing
+        return out.astype(dtype, copy=False)
+
+    def read_ids(self, models=None, items=None, **kwargs):
+        """Like ``read`` but selecting by model name / item ID."""
+        rows = None if models is None else self.row_index(models)
+        cols = None if items is None else self.col_index(items)
+        return self.read(rows, cols, **kwargs)
+
+    def iter_row_blocks(self, block_rows=None, cols=None, **kwargs):
+        """Yield (row_slice, block) bands, one tile row at a time by default."""
+        block_rows = block_rows or self.tile_shape[0]
+        for start in range(0, self.shape[0], block_rows):
+            rows = slice(start, min(start + block_rows, self.shape[0]))
+            yield rows, self.read(rows, cols, **kwargs)
+
+    def to_dataframe(self, rows=None, cols=None):
+        """Materialize a selection as a DataFrame labelled by the stored IDs."""
+        import pandas as pd
+
+        r_idx = _as_index(rows, self.shape[0])
+        c_idx = _as_index(cols, self.shape[1])
+        return pd.DataFrame(self.read(r_idx, c_idx),
+                            index=np.asarray(self.row_ids)[r_idx],
+                            columns=np.asarray(self.col_ids)[c_idx])
+
+    def __repr__(self):
+        return (f"ResponseStore({str(self.path)!r}, shape={self.shape}, "
+                f"tiles={self._tiles.shape[:2]})")
+
+
+def convert_pickle(pickle_path, store_path, tile_shape=TILE_SHAPE, overwrite=False):
+    """Convert a pickled DataFrame (rows = models, columns = items) to a store."""
+    with open(pickle_path, "rb") as f:
+        df = pickle.load(f)
+    return write_response_store(store_path, df.values, list(df.index), list(df.columns),
+                                tile_shape=tile_shape, overwrite=overwrite)
+
+
+def convert_tensor(tensor_path, store_path, tile_shape=TILE_SHAPE, overwrite=False):
+    """Convert a saved torch tensor (missing entries -1) to a store; IDs are positions."""
+    import torch
+
+    Y = torch.load(tensor_path).float().numpy()
+    Y = np.where(Y == -1, np.nan, Y)
+    return write_response_store(store_path, Y, [str(i) for i in range(Y.shape[0])],
+                                [str(j) for j in range(Y.shape[1])],
+                                tile_shape=tile_shape, overwrite=overwrite)
+
+
+def load_response_matrix(store_path=DEFAULT_STORE, fallback_path=DEFAULT_TENSOR):
+    """
+    The response matrix as a torch tensor with missing entries as -1.
+
+    Read from the store when it exists, otherwise from the dense tensor it
+    is built from, so a checkout without the store still renders.
+    """
+    import torch
+
+    if Path(store_path).exists():
+        return torch.from_numpy(ResponseStore.open(store_path).read(missing=-1))
+    return torch.load(fallback_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect response stores.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    conv = sub.add_parser("convert",
+                          help="Convert a pickled DataFrame or a .pt tensor to a store")
+    conv.add_argument("source")
+    conv.add_argument("store")
+    conv.add_argument("--tile-rows", type=int, default=TILE_SHAPE[0])
+    conv.add_argument("--tile-cols", type=int, default=TILE_SHAPE[1])
+    conv.add_argument("--overwrite", action="store_true")
+
+    info = sub.add_parser("info", help="Print store layout")
+    info.add_argument("store")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        print(f"Converting {args.source} -> {args.store}")
+        convert = convert_tensor if args.source.endswith(".pt") else convert_pickle
+        convert(args.source, args.store, tile_shape=(args.tile_rows, args.tile_cols),
+                overwrite=args.overwrite)
+
+    store = ResponseStore.open(args.store)
+    m = store.manifest
+    size = (store.path / "data.bin").stat().st_size
+    print(f"Response store: {store.path}")
+    print(f"  Shape: {m['shape'][0]} x {m['shape'][1]} "
+          f"({m['n_observed']} observed, {size / 1e6:.1f} MB payload)")
+    print(f"  Tiles: {m['tile_shape'][0]} x {m['tile_shape'][1]} -> {m['tile_kinds']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Score-to-ability lookup tables for the Rasch model.
+
+Under the Rasch model the raw score S = sum_j Y_j is a sufficient statistic
+for theta on a fixed item set (Chapter 1, "Sufficiency of Sum Scores"), so
+every response pattern with the same raw score has the same MLE, MAP and EAP
+estimate. Given calibrated difficulties (e.g. ``beta_hat`` from ``em_rasch``
+or the L-BFGS fit in Chapter 2) we precompute those estimates once for every
+possible score 0..M. Scoring a new model is then an O(M) sum followed by an
+O(1) table lookup.
+
+Booklets (fixed subsets of the item bank administered together) get their
+own tables, since the score-to-theta mapping depends on which items were
+taken.
+
+Usage:
+    python scripts/scoring_tables.py --betas beta_hat.npy
+    python scripts/scoring_tables.py --betas beta_hat.npy --booklets booklets.json \\
+        --output scoring_tables.json
+    python scripts/scoring_tables.py --betas beta_hat.npy --check
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+from numpy.polynomial.hermite import hermgauss
+
+# Configuration
+PRIOR_STD = 1.0      # theta ~ N(0, PRIOR_STD^2) for MAP and EAP
+N_QUADRATURE = 61    # Gauss-Hermite nodes for EAP (centred on each score's MAP)
+CHECK_SPACING = 50   # Brute-force check grid points per smallest posterior SD
+BLOCK_SIZE = 4_000_000  # Elements per (points x items) block of log-likelihoods
+NEWTON_ITERS = 50
+NEWTON_TOL = 1e-10
+
+
+def sigmoid(x):
+    """Numerically stable sigmoid function."""
+    return np.where(x >= 0,
+                    1 / (1 + np.exp(-x)),
+                    np.exp(x) / (1 + np.exp(x)))
+
+
+def _solve_score_equation(beta, scores, precision):
+    """
+    Solve sum_j P_j(theta) + precision * theta = s for every score at once.
+
+    precision = 0 gives the MLE, precision = 1/sigma^2 the MAP estimate.
+    The left side is strictly increasing in theta, so Newton's method from a
+    logit starting point converges for every interior score.
+    """
+    M = len(beta)
+    s = scores.astype(float)
+    p0 = np.clip(s / M, 0.5 / M, 1 - 0.5 / M)
+    theta = np.log(p0 / (1 - p0)) + beta.mean()
+
+    for _ in range(NEWTON_ITERS):
+        P = sigmoid(theta[:, None] - beta[None, :])          # (S, M)
+        resid = P.sum(axis=1) + precision * theta - s
+        info = (P * (1 - P)).sum(axis=1) + precision
+        step = np.clip(resid / info, -2.0, 2.0)
+        theta = theta - step
+        if np.max(np.abs(step)) < NEWTON_TOL:
+            break
+
+    P = sigmoid(theta[:, None] - beta[None, :])
+    info = (P * (1 - P)).sum(axis=1) + precision
+    return theta, 1 / np.sqrt(info)
+
+
+def _log_kernel(beta, scores, theta, prior_std):
+    """
+    Unnormalized log posterior of theta given raw score s, for each row.
+
+    P(S = s | theta) = gamma_s(beta) exp(s theta) / prod_j (1 + exp(theta - beta_j)),
+    and gamma_s does not depend on theta, so up to a per-score constant
+
+        log p(theta | s) = s theta - sum_j log(1 + exp(theta - beta_j)) - theta^2 / (2 sigma^2)
+
+    Parameters
+    ----------
+    scores : ndarray (S,)
+    theta : ndarray (S, Q)
+        Evaluation points for each score
+    """
+    flat = theta.ravel()
+    softplus = np.empty_like(flat)
+    step = max(1, BLOCK_SIZE // len(beta))
+    for start in range(0, len(flat), step):
+        block = flat[start:start + step, None] - beta[None, :]
+        softplus[start:start + step] = np.logaddexp(0, block).sum(axis=1)
+    return (scores[:, None] * theta - softplus.reshape(theta.shape)
+            - theta**2 / (2 * prior_std**2))
+
+
+def _posterior_moments(log_post, theta):
+    """Mean and SD of each row's discrete posterior."""
+    w = np.exp(log_post - log_post.max(axis=1, keepdims=True))
+    w /= w.sum(axis=1, keepdims=True)
+    mean = np.sum(w * theta, axis=1)
+    return mean, np.sqrt(np.sum(w * (theta - mean[:, None])**2, axis=1))
+
+
+def adaptive_eap(beta, scores, center, scale, prior_std=PRIOR_STD,
+                 n_quadrature=N_QUADRATURE):
+    """
+    EAP and posterior SD per raw score by adaptive Gauss-Hermite quadrature.
+
+    The nodes for score s are centred at ``center[s]`` (the MAP) and scaled
+    by ``scale[s]`` (its posterior SE), so they track the posterior however
+    narrow it gets on long tests; a rule centred on the prior puts all its
+    nodes outside a posterior narrower than the node spacing.
+    """
+    x, w = hermgauss(n_quadrature)
+    theta = center[:, None] + np.sqrt(2) * scale[:, None] * x[None, :]
+    # Gauss-Hermite absorbs exp(-x^2); undo it, the 1/scale factor cancels
+    log_post = np.log(w) + x**2 + _log_kernel(beta, scores, theta, prior_std)
+    return _posterior_moments(log_post, theta)
+
+
+def brute_force_eap(beta, scores, center, scale, prior_std=PRIOR_STD):
+    """
+    EAP and posterior SD per raw score on one fine uniform grid.
+
+    The grid covers every score's MAP +- 12 SE with CHECK_SPACING points per
+    smallest SE. Used to check ``adaptive_eap``.
+    """
+    lo, hi = np.min(center - 12 * scale), np.max(center + 12 * scale)
+    grid = np.linspace(lo, hi, int((hi - lo) / scale.min() * CHECK_SPACING) + 1)
+    log_lik = _log_kernel(beta, np.zeros(1), grid[None, :], prior_std)[0]
+    log_post = scores[:, None] * grid[None, :] + log_lik[None, :]
+    return _posterior_moments(log_post, np.broadcast_to(grid, log_post.shape))
+
+
+class ScoringTable:
+    """
+    Raw-score to ability lookup table for a fixed set of Rasch items.
+
+    Attributes
+    ----------
+    item_ids : ndarray (M,)
+        Indices (or IDs) of the items in the bank this table covers
+    beta : ndarray (M,)
+        Difficulties of those items
+    theta_mle, se_mle : ndarray (M + 1,)
+        Maximum likelihood estimate and SE per raw score; NaN / inf for the
+        zero and perfect scores, where the MLE does not exist
+    theta_map, se_map : ndarray (M + 1,)
+        MAP estimate and posterior SE (inverse observed information)
+    theta_eap, se_eap : ndarray (M + 1,)
+        Posterior mean and posterior standard deviation
+    """
+
+    def __init__(self, item_ids, beta, theta_mle, se_mle, theta_map, se_map,
+                 theta_eap, se_eap, prior_std=PRIOR_STD):
+        self.item_ids = np.asarray(item_ids)
+        self.beta = np.asarray(beta, dtype=float)
+        self.theta_mle = theta_mle
+        self.se_mle = se_mle
+        self.theta_map = theta_map
+        self.se_map = se_map
+        self.theta_eap = theta_eap
+        self.se_eap = se_eap
+        self.prior_std = prior_std
+
+    @classmethod
+    def build(cls, beta, item_ids=None, prior_std=PRIOR_STD,
+              n_quadrature=N_QUADRATURE):
+        """Precompute MLE, MAP and EAP estimates for every raw score."""
+        beta = np.asarray(beta, dtype=float)
+        M = len(beta)
+        if item_ids is None:
+            item_ids = np.arange(M)
+        scores = np.arange(M + 1)
+
+        # MLE exists only for interior scores
+        theta_mle = np.full(M + 1, np.nan)
+        se_mle = np.full(M + 1, np.inf)
+        theta_mle[0], theta_mle[M] = -np.inf, np.inf
+        if M > 1:
+            interior = scores[1:M]
+            theta_mle[1:M], se_mle[1:M] = _solve_score_equation(beta, interior, 0.0)
+
+        theta_map, se_map = _solve_score_equation(beta, scores, 1 / prior_std**2)
+
+        # EAP: raw score is sufficient, so posterior | pattern = posterior | S
+        theta_eap, se_eap = adaptive_eap(beta, scores, theta_map, se_map,
+                                         prior_std, n_quadrature)
+
+        return cls(item_ids, beta, theta_mle, se_mle, theta_map, se_map,
+                   theta_eap, se_eap, prior_std=prior_std)
+
+    @property
+    def n_items(self):
+        return len(self.beta)
+
+    def lookup(self, raw_score, method="eap"):
+        """Return (theta, se) for one raw score or an array of raw scores."""
+        theta = getattr(self, f"theta_{method}")
+        se = getattr(self, f"se_{method}")
+        return theta[raw_score], se[raw_score]
+
+    def score(self, responses, method="eap"):
+        """
+        Score complete response vectors on this table's items.
+
+        Parameters
+        ----------
+        responses : ndarray (M,) or (N, M)
+            Binary responses, columns ordered as ``item_ids``
+        method : {"eap", "map", "mle"}
+
+        Returns
+        -------
+        theta, se : float or ndarray (N,)
+        """
+        responses = np.asarray(responses)
+        if responses.shape[-1] != self.n_items:
+            raise ValueError(f"Expected {self.n_items} responses per row, "
+                             f"got {responses.shape[-1]}")
+        if responses.dtype.kind == "f" and np.isnan(responses).any():
+            raise ValueError("Scoring tables require complete responses; "
+                             "use a booklet table for the items actually taken")
+        raw = responses.sum(axis=-1).astype(int)
+        return self.lookup(raw, method)
+
+    def to_dict(self):
+        def clean(a):
+            return [None if not np.isfinite(v) else float(v) for v in a]
+
+        return {
+            "item_ids": self.item_ids.tolist(),
+            "prior_std": self.prior_std,
+            "raw_score": list(range(self.n_items + 1)),
+            "theta_mle": clean(self.theta_mle), "se_mle": clean(self.se_mle),
+            "theta_map": clean(self.theta_map), "se_map": clean(self.se_map),
+            "theta_eap": clean(self.theta_eap), "se_eap": clean(self.se_eap),
+        }
+
+
+def build_booklet_tables(beta, booklets, prior_std=PRIOR_STD):
+    """
+    Build one scoring table per booklet.
+
+    Parameters
+    ----------
+    beta : ndarray (M,)
+        Difficulties for the whole item bank
+    booklets : dict[str, sequence of int]
+        Booklet name -> indices of the bank items it contains
+
+    Returns
+    -------
+    dict[str, ScoringTable]
+    """
+    beta = np.asarray(beta, dtype=float)
+    tables = {}
+    for name, items in booklets.items():
+        items = np.asarray(items, dtype=int)
+        tables[name] = ScoringTable.build(beta[items], item_ids=items,
+                                          prior_std=prior_std)
+    return tables
+
+
+def load_betas(path):
+    path = Path(path)
+    if path.suffix == ".npy":
+        return np.load(path)
+    if path.suffix == ".json":
+        with open(path) as f:
+            return np.asarray(json.load(f), dtype=float)
+    return np.loadtxt(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--betas", required=True,
+                        help="Calibrated difficulties (.npy, .json or text)")
+    parser.add_argument("--booklets", default=None,
+                        help="JSON mapping booklet name -> list of item indices")
+    parser.add_argument("--prior-std", type=float, default=PRIOR_STD)
+    parser.add_argument("--output", default=None,
+                        help="Write tables as JSON instead of printing")
+    parser.add_argument("--check", action="store_true",
+                        help="Compare the EAP columns with a brute-force grid")
+    args = parser.parse_args()
+
+    beta = load_betas(args.betas)
+    if args.booklets:
+        with open(args.booklets) as f:
+            booklets = json.load(f)
+    else:
+        booklets = {"full": list(range(len(beta)))}
+
+    tables = build_booklet_tables(beta, booklets, prior_std=args.prior_std)
+
+    if args.check:
+        for name, table in tables.items():
+            scores = np.arange(table.n_items + 1)
+            eap, psd = brute_force_eap(table.beta, scores, table.theta_map,
+                                       table.se_map, table.prior_std)
+            print(f"Booklet '{name}' ({table.n_items} items): "
+                  f"max |EAP error| {np.max(np.abs(table.theta_eap - eap)):.2e}, "
+                  f"max |PSD error| {np.max(np.abs(table.se_eap - psd)):.2e} "
+                  f"(smallest PSD {psd.min():.3f})")
+        return
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({name: t.to_dict() for name, t in tables.items()}, f)
+        print(f"Saved {len(tables)} scoring table(s) to: {args.output}")
+        return
+
+    for name, table in tables.items():
+        print(f"\nBooklet '{name}' ({table.n_items} items)")
+        print(f"  {'score':>5} {'MLE':>8} {'MAP':>8} {'SE':>6} {'EAP':>8} {'PSD':>6}")
+        for s in range(table.n_items + 1):
+            print(f"  {s:>5} {table.theta_mle[s]:>8.3f} {table.theta_map[s]:>8.3f} "
+                  f"{table.se_map[s]:>6.3f} {table.theta_eap[s]:>8.3f} "
+                  f"{table.se_eap[s]:>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Build-time snapshots of expensive autorun pyodide cells.
+
+Some autorun cells (MCMC, cross-validation, D-optimal design) take tens of
+seconds in the browser. This script executes each chapter's pyodide cells
+once in CPython, in page order, and stores the outputs of the cells listed in
+SNAPSHOT_CELLS:
+
+    src/snapshots/chap2/
+        index.json              {label: key} for every snapshot in the chapter
+        mcmc-sampling.json      key, stdout, PNG figures, defs, small values
+        mcmc-sampling.npz       key arrays bound by the cell
+
+The key is the SHA-1 of the normalized sources of every cell up to and
+including the snapshotted one, plus the hashes of any data files they read,
+so editing an upstream cell or regenerating a data file invalidates it.
+src/pyodide/snapshots.js recomputes the same key in the browser, shows a
+matching snapshot immediately, skips the cell at autorun, and only runs the
+code when the reader edits it. Before the next cell runs, the snapshot's
+defs and arrays are loaded into the pyodide namespace so downstream cells
+see the same state as after a live run.
+
+Usage:
+    python scripts/snapshot_cells.py
+    python scripts/snapshot_cells.py --chapter chap3 --force
+    python scripts/snapshot_cells.py --check
+"""
+
+import argparse
+import ast
+import asyncio
+import base64
+import contextlib
+import hashlib
+import inspect
+import io
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Configuration
+SRC_DIR = Path(__file__).parent.parent / "src"
+OUTPUT_DIR = SRC_DIR / "snapshots"
+SNAPSHOT_CELLS = {
+    "chap2": ["mcmc-sampling", "cross-validation"],
+    "chap3": ["d-optimal-design"],
+}
+MAX_ARRAY_BYTES = 256_000  # Larger arrays are left for a live re-run
+FIGURE_DPI = 150
+
+CELL_START = re.compile(r"^```\{pyodide-python\}\s*$")
+INCLUDE = re.compile(r"^\{\{<\s*include\s+(\S+)\s*>\}\}\s*$")
+OPTION = re.compile(r"^#\|\s*(.*?):\s*(.*?)\s*$")
+DATA_REF = re.compile(r"""["']((?:data|pyodide)/[^"']+)["']""")
+
+
+def _expand_includes(path):
+    """Lines of a qmd file with ``{{< include >}}`` shortcodes inlined."""
+    lines = []
+    for line in path.read_text().splitlines():
+        match = INCLUDE.match(line.strip())
+        if match:
+            lines.extend(_expand_includes(path.parent / match.group(1)))
+        else:
+            lines.append(line)
+    return lines
+
+
+def parse_cells(qmd_path):
+    """
+    Pyodide cells of a chapter in page order.
+
+    Options (``#| key: value``) are split off the code exactly as the
+    pyodide extension does, so ``code`` matches what the browser receives.
+
+    Returns
+    -------
+    list of dict with keys ``label``, ``options`` and ``code``
+    """
+    cells, current = [], None
+    for line in _expand_includes(Path(qmd_path)):
+        if current is None:
+            if CELL_START.match(line):
+                current = []
+        elif line.strip() == "```":
+            options = dict(m.groups() for m in map(OPTION.match, current) if m)
+            code = "\n".join(l for l in current if not OPTION.match(l)).strip()
+            cells.append({"label": options.get("label"), "options": options, "code": code})
+            current = None
+        else:
+            current.append(line)
+    return cells
+
+
+def data_sha1(codes):
+    """Hash of the data files (relative to src/) referenced by the given sources."""
+    h = hashlib.sha1()
+    for ref in sorted({ref for code in codes for ref in DATA_REF.findall(code)}):
+        path = SRC_DIR / ref
+        if path.is_file():
+            h.update(ref.encode() + b"\0" + hashlib.sha1(path.read_bytes()).digest())
+    return h.hexdigest()
+
+
+def snapshot_key(codes, data_hash):
+    """Key of the last cell in ``codes``; mirrored by keyFor() in snapshots.js."""
+    return hashlib.sha1("\0".join(codes + [data_hash]).encode()).hexdigest()
+
+
+@contextlib.contextmanager
+def _capture_figures(figures):
+    """Redirect ``plt.show()`` to PNG captures appended to ``figures``."""
+    import matplotlib.pyplot as plt
+
+    def show(*args, **kwargs):
+        for num in plt.get_fignums():
+            buf = io.BytesIO()
+            plt.figure(num).savefig(buf, format="png", dpi=FIGURE_DPI, bbox_inches="tight")
+            figures.append(base64.b64encode(buf.getvalue()).decode())
+        plt.close("all")
+
+    original = plt.show
+    plt.show = show
+    try:
+        yield
+    finally:
+        plt.show = original
+
+
+def _install_pyfetch():
+    """Serve ``pyodide.http.pyfetch`` from the local src/ tree during the build."""
+    import types
+
+    class _LocalResponse:
+        def __init__(self, body):
+            self.status, self.ok, self._body = 200, True, body
+
+        async def bytes(self):
+            return self._body
+
+        async def string(self):
+            return self._body.decode()
+
+        async def json(self):
+            return json.loads(self._body)
+
+    async def pyfetch(url, **kwargs):
+        return _LocalResponse((SRC_DIR / url).read_bytes())
+
+    http = types.ModuleType("pyodide.http")
+    http.pyfetch = pyfetch
+    pyodide = types.ModuleType("pyodide")
+    pyodide.http = http
+    sys.modules.setdefault("pyodide", pyodide)
+    sys.modules.setdefault("pyodide.http", http)
+
+
+def run_cell(code, namespace, loop, name):
+    """Execute one cell (top-level ``await`` allowed). Returns captured stdout."""
+    compiled = compile(code, name, "exec", flags=ast.PyCF_ALLOW_TOP_LEVEL_AWAIT)
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+        result = eval(compiled, namespace)
+        if compiled.co_flags & inspect.CO_COROUTINE:
+            loop.run_until_complete(result)
+    return stdout.getvalue()
+
+
+def extract_state(code, namespace, before):
+    """
+    State a downstream cell may need from a snapshotted cell.
+
+    Returns
+    -------
+    defs : str
+        Source of the cell's top-level imports, functions and classes
+    values : dict
+        JSON-serializable scalars and lists bound by the cell
+    arrays : dict
+        NumPy arrays bound by the cell (up to MAX_ARRAY_BYTES each)
+    """
+    tree = ast.parse(code)
+    kinds = (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+    defs = "\n\n".join(ast.get_source_segment(code, node) for node in tree.body
+                       if isinstance(node, kinds))
+
+    values, arrays = {}, {}
+    for name, value in namespace.items():
+        if name.startswith("_") or before.get(name, None) is value:
+            continue
+        if isinstance(value, np.ndarray):
+            if value.dtype != object and value.nbytes <= MAX_ARRAY_BYTES:
+                arrays[name] = value
+        elif isinstance(value, (bool, int, float, str, list, tuple)) or value is None:
+            try:
+                values[name] = json.loads(json.dumps(value, allow_nan=False))
+            except (TypeError, ValueError):
+                pass
+    return defs, values, arrays
+
+
+def snapshot_chapter(chapter, labels, force=False, check=False):
+    """
+    Refresh the snapshots of one chapter. Returns a list of (label, status).
+
+    The chapter is only executed when at least one snapshot is stale; in
+    that case every cell up to the last requested label runs in one shared
+    namespace, as it would on the page.
+    """
+    cells = parse_cells(SRC_DIR / f"{chapter}.qmd")
+    positions = {cell["label"]: i for i, cell in enumerate(cells) if cell["label"]}
+    missing = [label for label in labels if label not in positions]
+    if missing:
+        raise KeyError(f"{chapter}: no pyodide cell labelled {', '.join(missing)}")
+
+    out_dir = OUTPUT_DIR / chapter
+    index_path = out_dir / "index.json"
+    index = json.loads(index_path.read_text()) if index_path.exists() else {}
+
+    keys, data_hashes = {}, {}
+    for label in labels:
+        codes = [cell["code"] for cell in cells[:positions[label] + 1]]
+        data_hashes[label] = data_sha1(codes)
+        keys[label] = snapshot_key(codes, data_hashes[label])
+    stale = [label for label in labels if force or index.get(label) != keys[label]]
+    status = [(label, "stale" if label in stale else "fresh") for label in labels]
+    if check or not stale:
+        return status
+
+    import matplotlib
+    matplotlib.use("Agg")
+    _install_pyfetch()
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    namespace = {"__name__": "__main__"}
+    loop = asyncio.new_event_loop()
+    last = max(positions[label] for label in stale)
+    try:
+        for i, cell in enumerate(cells[:last + 1]):
+            label = cell["label"]
+            before = dict(namespace)
+            figures = []
+            start = time.perf_counter()
+            with _capture_figures(figures):
+                stdout = run_cell(cell["code"], namespace, loop, f"<{chapter}:{label or i}>")
+            if label not in stale:
+                continue
+
+            defs, values, arrays = extract_state(cell["code"], namespace, before)
+            snapshot = {
+                "key": keys[label],
+                "data_sha1": data_hashes[label],
+                "label": label,
+                "stdout": stdout,
+                "figures": figures,
+                "fig_cap": cell["options"].get("fig-cap", "").strip("\"'"),
+                "defs": defs,
+                "values": values,
+                "arrays": f"{label}.npz" if arrays else None,
+                "seconds": round(time.perf_counter() - start, 2),
+            }
+            if arrays:
+                np.savez_compressed(out_dir / f"{label}.npz", **arrays)
+            with open(out_dir / f"{label}.json", "w") as f:
+                json.dump(snapshot, f)
+            index[label] = keys[label]
+            print(f"  {chapter}/{label}: {snapshot['seconds']:.1f}s, "
+                  f"{len(figures)} figure(s), {len(arrays)} array(s)")
+    finally:
+        loop.close()
+
+    # Drop snapshots that are no longer requested
+    for label in set(index) - set(SNAPSHOT_CELLS.get(chapter, [])):
+        del index[label]
+        for suffix in (".json", ".npz"):
+            (out_dir / f"{label}{suffix}").unlink(missing_ok=True)
+    with open(index_path, "w") as f:
+        json.dump(index, f, indent=2)
+    return [(label, "rebuilt" if label in stale else "fresh") for label in labels]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot expensive autorun pyodide cells.")
+    parser.add_argument("--chapter", choices=sorted(SNAPSHOT_CELLS), default=None)
+    parser.add_argument("--force", action="store_true", help="Rebuild even if keys match")
+    parser.add_argument("--check", action="store_true",
+                        help="Only report stale snapshots (exit 1 if any)")
+    args = parser.parse_args()
+
+    chapters = [args.chapter] if args.chapter else sorted(SNAPSHOT_CELLS)
+    stale = 0
+    for chapter in chapters:
+        for label, status in snapshot_chapter(chapter, SNAPSHOT_CELLS[chapter],
+                                              args.force, args.check):
+            print(f"  {chapter}/{label}: {status}")
+            stale += status == "stale"
+    if args.check and stale:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,16 +14,29 @@ Layout convention for hierarchical models (nested design):
   - Outer plate for benchmarks (j), inner plate for items (i)
   - Genuine nesting (items within benchmarks)
 
+Only diagrams whose hash (preamble + TikZ body + DPI) differs from the one
+recorded in .plates.json are rebuilt. Changed diagrams are compiled as the
+pages of a single standalone document, so pdflatex parses the preamble once,
+and pdftoppm rasterizes all pages in one pass. If that document fails, the
+diagrams are compiled separately in parallel to isolate the error.
+
 Usage:
     python generate_plates.py
+    python generate_plates.py --force
 """
+import argparse
+import glob
+import hashlib
+import json
 import os
 import subprocess
 import tempfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
 OUT = os.path.dirname(os.path.abspath(__file__))
 DPI = 300
+MANIFEST = os.path.join(OUT, ".plates.json")
 
 # ─── Common TikZ preamble ───────────────────────────────────────────
 PREAMBLE = r"""
@@ -56,38 +69,101 @@ PREAMBLE = r"""
 """
 
 
-def compile_tikz(name: str, body: str) -> None:
-    """Compile a TikZ body to PNG via pdflatex + pdftoppm."""
+def diagram_hash(body: str) -> str:
+    """Content hash of a diagram: preamble, body and raster settings."""
+    return hashlib.sha256(f"{PREAMBLE}\0{body}\0{DPI}".encode()).hexdigest()
+
+
+def _run_pdflatex(tmp: str, tex: str) -> subprocess.CompletedProcess:
+    tex_path = os.path.join(tmp, "diagram.tex")
+    with open(tex_path, "w") as f:
+        f.write(tex)
+    return subprocess.run(
+        ["pdflatex", "-interaction=nonstopmode", "-output-directory", tmp, tex_path],
+        capture_output=True, text=True, timeout=120,
+    )
+
+
+def _rasterize(tmp: str, names: list) -> bool:
+    """Convert every page of diagram.pdf to PNG in one pdftoppm pass."""
+    out_prefix = os.path.join(tmp, "out")
+    result = subprocess.run(
+        ["pdftoppm", "-png", "-r", str(DPI), os.path.join(tmp, "diagram.pdf"), out_prefix],
+        capture_output=True, text=True, timeout=120,
+    )
+    # pdftoppm numbers pages out-1.png or out-01.png depending on the page count
+    pages = sorted(glob.glob(out_prefix + "-*.png"),
+                   key=lambda p: int(p.rsplit("-", 1)[1][:-4]))
+    if result.returncode != 0 or len(pages) != len(names):
+        print(f"  ERROR rasterizing {', '.join(names)}: {result.stderr.strip()}")
+        return False
+    for name, src_png in zip(names, pages):
+        shutil.copy2(src_png, os.path.join(OUT, name))
+        print(f"  saved {name}")
+    return True
+
+
+def compile_tikz(name: str, body: str) -> bool:
+    """Compile a single TikZ body to PNG via pdflatex + pdftoppm."""
     tex = PREAMBLE + r"\begin{document}" + "\n" + body + "\n" + r"\end{document}"
 
     with tempfile.TemporaryDirectory() as tmp:
-        tex_path = os.path.join(tmp, "diagram.tex")
-        pdf_path = os.path.join(tmp, "diagram.pdf")
-        with open(tex_path, "w") as f:
-            f.write(tex)
-
-        # Compile LaTeX
-        result = subprocess.run(
-            ["pdflatex", "-interaction=nonstopmode", "-output-directory", tmp, tex_path],
-            capture_output=True, text=True, timeout=30,
-        )
+        result = _run_pdflatex(tmp, tex)
         if result.returncode != 0:
             print(f"  ERROR compiling {name}:")
             for line in result.stdout.split("\n")[-30:]:
                 if line.strip():
                     print(f"    {line}")
-            return
-
-        # Convert PDF -> PNG
-        out_prefix = os.path.join(tmp, "out")
-        subprocess.run(
-            ["pdftoppm", "-png", "-r", str(DPI), pdf_path, out_prefix],
-            capture_output=True, timeout=30,
-        )
-        src_png = out_prefix + "-1.png"
-        dst_png = os.path.join(OUT, name)
-        shutil.copy2(src_png, dst_png)
-        print(f"  saved {name}")
+            return False
+        return _rasterize(tmp, [name])
+
+
+def compile_pages(diagrams: list) -> bool:
+    """
+    Compile several diagrams as the pages of one standalone document.
+
+    The ``tikz`` class option puts every tikzpicture on its own page, so the
+    preamble is parsed once and all pages are rasterized in one pass.
+    """
+    tex = (PREAMBLE + r"\begin{document}" + "\n"
+           + "\n".join(body for _, body in diagrams) + "\n" + r"\end{document}")
+    with tempfile.TemporaryDirectory() as tmp:
+        if _run_pdflatex(tmp, tex).returncode != 0:
+            return False
+        return _rasterize(tmp, [name for name, _ in diagrams])
+
+
+def load_manifest() -> dict:
+    if os.path.exists(MANIFEST):
+        with open(MANIFEST) as f:
+            return json.load(f)
+    return {}
+
+
+def generate(diagrams: list, force: bool = False, jobs: int = 4) -> None:
+    """Rebuild the diagrams whose hash changed (all of them with ``force``)."""
+    manifest = load_manifest()
+    changed = [(name, body) for name, body in diagrams
+               if force or manifest.get(name) != diagram_hash(body)
+               or not os.path.exists(os.path.join(OUT, name))]
+    if not changed:
+        print("  all plates up to date")
+        return
+    print(f"  {len(changed)} of {len(diagrams)} plate(s) changed")
+
+    if compile_pages(changed):
+        built = [name for name, _ in changed]
+    else:
+        # One diagram broke the shared document: compile separately (in
+        # parallel) to report the error and still save the others
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            ok = list(pool.map(lambda d: compile_tikz(*d), changed))
+        built = [name for (name, _), success in zip(changed, ok) if success]
+
+    bodies = dict(diagrams)
+    manifest.update({name: diagram_hash(bodies[name]) for name in built})
+    with open(MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
 
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -291,7 +367,13 @@ HIERARCHICAL = r"""
 """
 
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description="Generate plate diagrams.")
+    parser.add_argument("--force", action="store_true", help="Rebuild unchanged plates too")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 4,
+                        help="Parallel pdflatex runs when falling back to per-diagram builds")
+    args = parser.parse_args()
+
     print("Generating plate diagrams (standalone TikZ -> PNG)...")
     diagrams = [
         ("plate_rasch.png",        RASCH),
@@ -302,6 +384,9 @@ if __name__ == "__main__":
         ("plate_ising.png",        ISING),
         ("plate_hierarchical.png", HIERARCHICAL),
     ]
-    for name, body in diagrams:
-        compile_tikz(name, body)
+    generate(diagrams, force=args.force, jobs=args.jobs)
     print("Done!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+/**
+ * Build-time snapshots for expensive autorun pyodide cells.
+ *
+ * scripts/snapshot_cells.py executes the cells listed in its SNAPSHOT_CELLS
+ * once in CPython and writes snapshots/<chapter>/<label>.json (stdout, PNG
+ * figures, defs, small values) plus an optional .npz of arrays. This script:
+ *
+ *   1. recomputes each snapshot's key from the cell sources on the page and
+ *      shows matching snapshots in the output areas right away;
+ *   2. swallows Run clicks (including the autorun clicks) on a snapshotted
+ *      cell while its code is unedited, so it is only recomputed on edit;
+ *   3. loads the snapshot's defs, values and arrays into pyodide before a
+ *      later cell runs, so downstream cells see the state of a live run.
+ *
+ * Include it before the autorun script of the chapter.
+ */
+(function () {
+  const chapter = location.pathname.split('/').pop().replace(/\.html$/, '');
+  const base = `snapshots/${chapter}`;
+  const shown = new Map();   // cell id -> snapshot shown in place of a run
+  const pending = [];        // snapshots whose state is not yet in pyodide
+  let runPosition = null;    // page position of the cell being run, if known
+
+  async function sha1(text) {
+    const digest = await crypto.subtle.digest('SHA-1', new TextEncoder().encode(text));
+    return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+  }
+
+  // Mirrors snapshot_key() in scripts/snapshot_cells.py
+  function keyFor(cells, position, dataHash) {
+    const codes = cells.slice(0, position + 1).map((cell) => cell.code.trim());
+    return sha1(codes.concat([dataHash]).join('\0'));
+  }
+
+  function editorCode(id) {
+    if (typeof monaco === 'undefined') return null;
+    const editor = monaco.editor.getEditors().find((e) => e.__qpyodideCounter === id);
+    return editor ? editor.getValue().trim() : null;
+  }
+
+  function render(cell, snapshot) {
+    const codeDiv = document.getElementById(`qpyodide-output-code-area-${cell.id}`);
+    const graphDiv = document.getElementById(`qpyodide-output-graph-area-${cell.id}`);
+    if (!codeDiv || !graphDiv) return false;
+
+    const pre = document.createElement('pre');
+    const div = document.createElement('div');
+    div.textContent = snapshot.stdout;
+    pre.appendChild(div);
+    if (!/\S/.test(snapshot.stdout)) pre.style.visibility = 'hidden';
+    codeDiv.replaceChildren(pre);
+
+    const figure = document.createElement('figure');
+    snapshot.figures.forEach((png) => {
+      const img = document.createElement('img');
+      img.src = `data:image/png;base64,${png}`;
+      img.style.maxWidth = '100%';
+      figure.appendChild(img);
+    });
+    const caption = document.createElement('figcaption');
+    caption.innerText = cell.options['fig-cap'] || snapshot.fig_cap || '';
+    figure.appendChild(caption);
+    const note = document.createElement('small');
+    note.className = 'qpyodide-snapshot-note';
+    note.innerText = 'Precomputed output. Edit the code and run it to recompute.';
+    figure.appendChild(note);
+    graphDiv.replaceChildren(figure);
+    return true;
+  }
+
+  async function restoreState(py, run, before) {
+    while (pending.length && pending[0].position < before) {
+      const snapshot = pending.shift();
+      if (snapshot.defs) {
+        await py.loadPackagesFromImports(snapshot.defs);
+        await run(snapshot.defs);
+      }
+      py.globals.set('_snapshot_values', JSON.stringify(snapshot.values));
+      let npz = '';
+      if (snapshot.arrays) {
+        const resp = await fetch(`${base}/${snapshot.arrays}`);
+        npz = `/tmp/${snapshot.arrays}`;
+        py.FS.writeFile(npz, new Uint8Array(await resp.arrayBuffer()));
+      }
+      py.globals.set('_snapshot_npz', npz);
+      await run(`
+import json as _json
+import numpy as _np
+globals().update(_json.loads(_snapshot_values))
+if _snapshot_npz:
+    with _np.load(_snapshot_npz) as _f:
+        globals().update({_k: _f[_k] for _k in _f.files})
+`);
+    }
+  }
+
+  // Restore snapshot state lazily, just before a later cell executes
+  function hookPyodide() {
+    const py = globalThis.mainPyodide;
+    if (!py) {
+      setTimeout(hookPyodide, 500);
+      return;
+    }
+    const run = py.runPythonAsync.bind(py);
+    py.runPythonAsync = async function (code, options) {
+      const before = runPosition === null ? Infinity : runPosition;
+      runPosition = null;
+      await restoreState(py, run, before);
+      return run(code, options);
+    };
+  }
+
+  // Run clicks on an unedited snapshotted cell keep the snapshot
+  document.addEventListener('click', (event) => {
+    const button = event.target.closest && event.target.closest('.qpyodide-button-run');
+    if (!button) return;
+    const id = Number(button.id.replace('qpyodide-button-run-', ''));
+    const cells = globalThis.qpyodideCellDetails || [];
+    runPosition = cells.findIndex((cell) => cell.id === id);
+    const snapshot = shown.get(id);
+    if (!snapshot) return;
+    const code = editorCode(id);
+    if (code === null || code === snapshot.code) {
+      runPosition = null;
+      event.stopPropagation();
+      event.preventDefault();
+    } else {
+      // Edited: the live run replaces the snapshot and its state
+      shown.delete(id);
+      pending.splice(pending.indexOf(snapshot), 1);
+    }
+  }, true);
+
+  async function showSnapshots() {
+    const cells = globalThis.qpyodideCellDetails;
+    if (!cells || !(globalThis.crypto && crypto.subtle)) return;
+    const resp = await fetch(`${base}/index.json`);
+    if (!resp.ok) return;
+    const index = await resp.json();
+
+    for (const [position, cell] of cells.entries()) {
+      const label = cell.options && cell.options.label;
+      if (!label || !(label in index)) continue;
+      const snapshot = await (await fetch(`${base}/${label}.json`)).json();
+      if (snapshot.key !== await keyFor(cells, position, snapshot.data_sha1)) {
+        console.log(`Snapshot for ${label} is stale; running the cell instead`);
+        continue;
+      }
+      snapshot.code = cell.code.trim();
+      snapshot.position = position;
+      if (render(cell, snapshot)) {
+        shown.set(cell.id, snapshot);
+        pending.push(snapshot);
+      }
+    }
+  }
+
+  document.addEventListener('DOMContentLoaded', () => {
+    showSnapshots().catch((err) => console.warn('Snapshots unavailable:', err));
+    hookPyodide();
+  });
+})();
@@ -0,0 +1,199 @@
+"""
+Lazy, tile-based loading of large response matrices inside pyodide cells.
+
+Reads the layout written by ``scripts/build_tiles.py``: an ``index.json``
+plus a ``tiles.bin`` of row-block tiles. Only the tiles covering the
+requested rows are fetched, via HTTP range requests when the server honours
+them. The first range request is a probe that the other tiles wait for: if
+the server answers it with the whole file instead of 206, the loader
+switches to per-tile files when the index has them, and otherwise keeps
+that one download of ``tiles.bin`` (never fetching it twice). Decoded tiles
+are kept in an LRU cache.
+
+In a pyodide cell:
+
+    from pyodide.http import pyfetch
+    with open("tile_loader.py", "w") as f:
+        f.write(await (await pyfetch("pyodide/tile_loader.py")).string())
+    from tile_loader import TiledMatrix
+
+    helm = await TiledMatrix.open("data/tiles/helm")
+    Y = await helm.read(rows=range(0, 120), cols=slice(0, 5000))
+
+Outside the browser the same code runs on CPython (``urllib`` replaces
+``pyfetch``), so a local ``python -m http.server`` can stand in for the site.
+"""
+
+import asyncio
+import json
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    from pyodide.http import pyfetch
+except ImportError:  # CPython
+    pyfetch = None
+
+CACHE_TILES = 32
+
+
+class _Response:
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+
+async def _fetch(url, byte_range=None):
+    """GET ``url`` (optionally a byte range). Returns status and body bytes."""
+    headers = {} if byte_range is None else {"Range": "bytes=%d-%d" % byte_range}
+    if pyfetch is not None:
+        resp = await pyfetch(url, headers=headers)
+        if not resp.ok:
+            raise OSError(f"GET {url} failed with status {resp.status}")
+        return _Response(resp.status, await resp.bytes())
+
+    import urllib.request
+
+    def get():
+        req = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(req) as resp:
+            return _Response(resp.status, resp.read())
+
+    return await asyncio.get_running_loop().run_in_executor(None, get)
+
+
+def _decode(payload, n_rows, n_cols):
+    bits = np.unpackbits(np.frombuffer(payload, np.uint8),
+                         count=2 * n_rows * n_cols).reshape(2, n_rows, n_cols)
+    Y = bits[0].astype(np.float32)
+    Y[bits[1] == 1] = np.nan
+    return Y
+
+
+class TiledMatrix:
+    """Row-tiled response matrix fetched on demand."""
+
+    def __init__(self, base_url, index, cache_tiles=CACHE_TILES):
+        self.base_url = base_url.rstrip("/")
+        self.index = index
+        self.shape = tuple(index["shape"])
+        self.tile_rows = index["tile_rows"]
+        self.models = index["models"]
+        self.cache_tiles = cache_tiles
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._items = None
+        self._whole = None
+        self._whole_fetch = None
+        self._ranges_ok = None  # Unknown until the first range request returns
+        self._probe = None
+
+    @classmethod
+    async def open(cls, base_url, cache_tiles=CACHE_TILES):
+        resp = await _fetch(base_url.rstrip("/") + "/index.json")
+        return cls(base_url, json.loads(resp.body), cache_tiles)
+
+    async def items(self):
+        if self._items is None:
+            resp = await _fetch(f"{self.base_url}/{self.index['items_file']}")
+            self._items = json.loads(resp.body)
+        return self._items
+
+    async def _range_payload(self, t):
+        """Tile ``t`` by range request, recording whether the server honours Range."""
+        tile = self.index["tiles"][t]
+        start, end = tile["offset"], tile["offset"] + tile["length"] - 1
+        resp = await _fetch(f"{self.base_url}/{self.index['data_file']}", (start, end))
+        if resp.status == 206:
+            self._ranges_ok = True
+            return resp.body
+        # The server ignored Range and sent the whole file. Per-tile files are
+        # cheaper from now on; without them this download is the data file.
+        self._ranges_ok = False
+        if not all("file" in tile for tile in self.index["tiles"]):
+            self._whole = resp.body
+        return resp.body[start:end + 1]
+
+    async def _run_probe(self, t):
+        try:
+            return await self._range_payload(t)
+        except Exception:
+            self._probe = None  # Let the next tile probe again
+            raise
+
+    async def _whole_file(self):
+        """``tiles.bin`` in full, downloaded once however many tiles ask for it."""
+        if self._whole_fetch is None:
+            self._whole_fetch = asyncio.ensure_future(
+                _fetch(f"{self.base_url}/{self.index['data_file']}"))
+        try:
+            self._whole = (await self._whole_fetch).body
+        except Exception:
+            self._whole_fetch = None
+            raise
+        return self._whole
+
+    async def _load_payload(self, t):
+        tile = self.index["tiles"][t]
+        start, end = tile["offset"], tile["offset"] + tile["length"] - 1
+        if self._ranges_ok is None:
+            if self._probe is None:
+                self._probe = asyncio.ensure_future(self._run_probe(t))
+                return await self._probe
+            # Wait for the probe's verdict before choosing a strategy
+            try:
+                await self._probe
+            except Exception:
+                pass
+            if self._ranges_ok is None:
+                return await self._load_payload(t)
+        if self._whole is not None:
+            return self._whole[start:end + 1]
+        if self._ranges_ok:
+            return await self._range_payload(t)
+        if "file" in tile:
+            return (await _fetch(f"{self.base_url}/{tile['file']}")).body
+        return (await self._whole_file())[start:end + 1]
+
+    async def tile(self, t):
+        """Decoded tile ``t`` as a float array (NaN = missing), via the LRU cache."""
+        if t in self._cache:
+            self._cache.move_to_end(t)
+            return self._cache[t]
+        if t not in self._pending:
+            # Concurrent requests for the same tile share one fetch
+            self._pending[t] = asyncio.ensure_future(self._load_payload(t))
+        try:
+            payload = await self._pending[t]
+        finally:
+            self._pending.pop(t, None)
+        if t in self._cache:
+            return self._cache[t]
+        block = _decode(payload, self.index["tiles"][t]["n_rows"], self.shape[1])
+        self._cache[t] = block
+        while len(self._cache) > self.cache_tiles:
+            self._cache.popitem(last=False)
+        return block
+
+    async def read(self, rows=None, cols=None):
+        """
+        Read rows (range, slice, list or None for all) and optional columns.
+
+        Only the tiles covering ``rows`` are fetched; they are fetched
+        concurrently.
+        """
+        if rows is None:
+            rows = range(self.shape[0])
+        elif isinstance(rows, slice):
+            rows = range(*rows.indices(self.shape[0]))
+        rows = np.asarray(list(rows), dtype=np.int64)
+        tile_ids = rows // self.tile_rows
+        needed = sorted(set(tile_ids.tolist()))
+        blocks = dict(zip(needed, await asyncio.gather(*(self.tile(t) for t in needed))))
+
+        out = np.empty((len(rows), self.shape[1]), dtype=np.float32)
+        for t in needed:
+            pos = np.flatnonzero(tile_ids == t)
+            out[pos] = blocks[t][rows[pos] - t * self.tile_rows]
+        return out if cols is None else out[:, cols]